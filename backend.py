@@ -0,0 +1,184 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Backend de calcul des etapes les plus couteuses du codec. Le code Python de encoding.py est le backend de reference
+('python'), toujours disponible. Si NumPy est installé, le backend 'numpy' fait les memes calculs par operations sur
+des tableaux : deltas de la version 4 et classement des blocs, regroupement des indices de palette en profondeur < 8,
+expansion des runs et des indices en canaux RGB. Les deux backends produisent exactement les memes bytes (verifié par
+python benchmark.py --check-backends).
+
+Le backend est choisi par la variable d'environnement ULBMP_BACKEND ('auto' par defaut : NumPy s'il est installé),
+ou par choisir_backend / utiliser_backend.
+"""
+
+import os
+from contextlib import contextmanager
+
+BACKENDS = ('auto', 'python', 'numpy')
+
+
+class BackendNumpy:
+    """
+    Implementations NumPy, chaque methode remplace la fonction de encoding.py du meme nom (memes parametres, meme
+    resultat).
+    """
+    def __init__(self, numpy):
+        self.np = numpy
+
+    def encode_rgb_v4(self, buffer, pixel_prec=(0, 0, 0)):
+        """
+        Deltas de tous les pixels avec numpy.diff (le pixel precedent du premier pixel ajouté en tete), puis un masque
+        par type de bloc dans l'ordre de priorité de l'encodeur de reference. Les longueurs des blocs donnent la
+        position de chaque bloc par somme cumulée, et les bytes de chaque type sont écrits en une fois.
+        """
+        np = self.np
+        pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 3).astype(np.int16)
+        if len(pixels) == 0:
+            return bytearray()
+        deltas = np.diff(np.vstack((np.array(pixel_prec, dtype=np.int16), pixels)), axis=0)
+        delta_r, delta_g, delta_b = deltas[:, 0], deltas[:, 1], deltas[:, 2]
+        delta_rg, delta_bg, delta_br = delta_r - delta_g, delta_b - delta_g, delta_b - delta_r
+
+        def entre(valeurs, minimum, maximum):
+            return (valeurs >= minimum) & (valeurs <= maximum)
+
+        small = ((deltas >= -2) & (deltas <= 1)).all(axis=1)
+        reste = ~small
+        intermediate = reste & entre(delta_g, -32, 31) & entre(delta_rg, -8, 7) & entre(delta_bg, -8, 7)
+        reste &= ~intermediate
+        big_r = reste & entre(delta_r, -128, 127) & entre(-delta_rg, -32, 31) & entre(delta_br, -32, 31)
+        reste &= ~big_r
+        big_g = reste & entre(delta_g, -128, 127) & entre(delta_rg, -32, 31) & entre(delta_bg, -32, 31)
+        reste &= ~big_g
+        big_b = reste & entre(delta_b, -128, 127) & entre(-delta_br, -32, 31) & entre(-delta_bg, -32, 31)
+        new = reste & ~big_b
+        longueurs = small + 2 * intermediate + 3 * (big_r | big_g | big_b) + 4 * new
+        debuts = np.cumsum(longueurs) - longueurs
+        sortie = np.empty(int(longueurs.sum()), dtype=np.uint8)
+        sortie[debuts[small]] = (((delta_r + 2) << 4) | ((delta_g + 2) << 2) | (delta_b + 2))[small]
+        position = debuts[intermediate]
+        sortie[position] = 64 | (delta_g[intermediate] + 32)
+        sortie[position + 1] = ((delta_rg[intermediate] + 8) << 4) | (delta_bg[intermediate] + 8)
+        for masque, signature, delta1, delta2, delta3 in ((big_r, 128, delta_r, -delta_rg, delta_br),
+                                                          (big_g, 144, delta_g, delta_rg, delta_bg),
+                                                          (big_b, 160, delta_b, -delta_br, -delta_bg)):
+            position = debuts[masque]
+            delta1, delta2, delta3 = delta1[masque] + 128, delta2[masque] + 32, delta3[masque] + 32
+            sortie[position] = signature | (delta1 >> 4)
+            sortie[position + 1] = ((delta1 & 0b1111) << 4) | (delta2 >> 2)
+            sortie[position + 2] = ((delta2 & 0b11) << 6) | delta3
+        position = debuts[new]
+        sortie[position] = 255
+        for canal in range(3):
+            sortie[position + 1 + canal] = pixels[new, canal]
+        return bytearray(sortie.tobytes())
+
+    def empaqueter_indices(self, indices, profondeur):
+        """
+        Indices completés par des 0 puis regroupés par ligne de 8 // profondeur, chaque colonne decalée de sa
+        position dans le byte (numpy.packbits pour la profondeur 1).
+        """
+        np = self.np
+        indices_par_byte = 8 // profondeur
+        tableau = np.frombuffer(bytes(indices) + bytes(-len(indices) % indices_par_byte), dtype=np.uint8)
+        if profondeur == 1:
+            return np.packbits(tableau).tobytes()
+        decalages = np.arange(8 - profondeur, -1, -profondeur, dtype=np.uint8)
+        return np.bitwise_or.reduce(tableau.reshape(-1, indices_par_byte) << decalages, axis=1).tobytes()
+
+    def decode_depth_under_8(self, bytes_pixels, depth, buffer, liste_palette, pixels_expected):
+        """
+        Indices extraits de tous les bytes par decalages (numpy.unpackbits pour la profondeur 1), tronqués au nombre
+        de pixels attendus, puis remplacés par leur couleur par indexation du tableau de la palette. Sert aussi à la
+        profondeur 8 sans RLE.
+        """
+        np = self.np
+        tableau = np.frombuffer(bytes_pixels, dtype=np.uint8)
+        if depth == 1:
+            indices = np.unpackbits(tableau)
+        else:
+            decalages = np.arange(8 - depth, -1, -depth, dtype=np.uint8)
+            indices = ((tableau[:, None] >> decalages) & ((1 << depth) - 1)).ravel()
+        buffer += self.couleurs_palette(indices[:pixels_expected], liste_palette)
+        return buffer
+
+    def decode_pixels_v2(self, bytes_pixels, buffer):
+        """
+        Canaux RGB de chaque bloc répetés par numpy.repeat selon l'occurence du bloc.
+        """
+        np = self.np
+        blocs = np.frombuffer(bytes_pixels, dtype=np.uint8, count=len(bytes_pixels) // 4 * 4).reshape(-1, 4)
+        buffer += np.repeat(blocs[:, 1:], blocs[:, 0], axis=0).tobytes()
+        return buffer
+
+    def decode_rle_v3(self, bytes_pixels, buffer, liste_palette):
+        """
+        Indices de la version 3 en profondeur 8 avec RLE répetés par numpy.repeat, puis remplacés par leur couleur.
+        """
+        np = self.np
+        blocs = np.frombuffer(bytes_pixels, dtype=np.uint8, count=len(bytes_pixels) // 2 * 2).reshape(-1, 2)
+        buffer += self.couleurs_palette(np.repeat(blocs[:, 1], blocs[:, 0]), liste_palette)
+        return buffer
+
+    def couleurs_palette(self, indices, liste_palette):
+        np = self.np
+        palette = np.frombuffer(b''.join(liste_palette), dtype=np.uint8).reshape(-1, 3)
+        if len(indices) and int(indices.max()) >= len(palette):
+            raise IndexError('list index out of range')
+        return palette[indices].tobytes()
+
+
+def charger_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return BackendNumpy(numpy)
+
+
+def choisir_backend(nom: str):
+    """
+    Choisit le backend utilisé par encoding.py : 'python' (reference), 'numpy' (leve une ValueError si NumPy n'est
+    pas installé) ou 'auto' (NumPy s'il est installé).
+    """
+    global BACKEND_ACTIF
+    if nom not in BACKENDS:
+        raise ValueError(f'Unknown backend {nom!r}, expected one of {BACKENDS}')
+    if nom == 'python':
+        BACKEND_ACTIF = None
+        return
+    numpy = charger_numpy()
+    if numpy is None and nom == 'numpy':
+        raise ValueError('The numpy backend needs NumPy to be installed')
+    BACKEND_ACTIF = numpy
+
+
+def nom_backend():
+    return 'python' if BACKEND_ACTIF is None else 'numpy'
+
+
+@contextmanager
+def utiliser_backend(nom: str):
+    """
+    Utilise le backend donné le temps d'un bloc 'with' (pour comparer les backends), puis revient au precedent.
+    """
+    precedent = BACKEND_ACTIF
+    choisir_backend(nom)
+    try:
+        yield
+    finally:
+        globals()['BACKEND_ACTIF'] = precedent
+
+
+def accelere():
+    """
+    Return le backend NumPy s'il est actif, None si les fonctions de reference de encoding.py doivent etre utilisées.
+    """
+    return BACKEND_ACTIF
+
+
+BACKEND_ACTIF = None
+choisir_backend(os.environ.get('ULBMP_BACKEND', 'auto'))
@@ -0,0 +1,412 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Banc d'essai reproductible des encodeurs et decodeurs ULBMP, sur les images de images_rapport et sur des images
+synthetiques, avec resultats en JSON pour comparer deux commits :
+    python benchmark.py -o avant.json
+    python benchmark.py -o apres.json --compare avant.json
+    python benchmark.py --workers 8     (ajoute le passage à l'echelle de 1 à 8 processus)
+    python benchmark.py --check-backends (compare les backends Python et NumPy bytes par bytes)
+    python benchmark.py --load-test 200 --clients 16 --executor process  (latences de Decoder.aload sous charge)
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import backend
+from encoding import Decoder, Encoder
+from estimation import estimer_variantes, statistiques
+from image import Image
+
+VARIANTES = [('v1', 1, {}), ('v2', 2, {})] + [
+    (f"v3_d{depth}{'_rle' if rle else ''}", 3, {'depth': depth, 'rle': rle})
+    for depth in (1, 2, 4, 8, 24) for rle in ((False, True) if depth in (8, 24) else (False,))
+] + [('v4', 4, {}), ('v5', 5, {})]
+
+
+def images_corpus(dossier='images_rapport'):
+    """
+    Return les images de reference du corpus (le fichier <nom>/<nom>.ulbmp de chaque sous-dossier).
+    """
+    images = {}
+    for nom in sorted(os.listdir(dossier)):
+        path = os.path.join(dossier, nom, nom + '.ulbmp')
+        if os.path.isfile(path):
+            images[nom] = Decoder.load_from(path)
+    return images
+
+
+def images_synthetiques(largeur=256, hauteur=256, graine=0):
+    """
+    Return des images synthetiques generées de maniere deterministe : bruit aleatoire, degradé, aplat uni, et images
+    de 2, 4, 16 et 256 couleurs tirées au hasard (par runs de longueur aleatoire, comme des zones d'une image réelle).
+    """
+    aleatoire = random.Random(graine)
+    nombre_pixels = largeur * hauteur
+    images = {'bruit': Image(largeur, hauteur, aleatoire.randbytes(nombre_pixels * 3))}
+    degrade = bytearray(nombre_pixels * 3)
+    for y in range(hauteur):
+        for x in range(largeur):
+            i = (y * largeur + x) * 3
+            degrade[i:i + 3] = bytes((x * 255 // max(largeur - 1, 1), y * 255 // max(hauteur - 1, 1),
+                                      (x + y) * 255 // max(largeur + hauteur - 2, 1)))
+    images['degrade'] = Image(largeur, hauteur, degrade)
+    images['uni'] = Image(largeur, hauteur, bytes((30, 120, 200)) * nombre_pixels)
+    for nombre_couleurs in (2, 4, 16, 256):
+        couleurs = [aleatoire.randbytes(3) for _ in range(nombre_couleurs)]
+        couleurs = list(dict.fromkeys(couleurs))
+        pixels = bytearray()
+        while len(pixels) < nombre_pixels * 3:
+            pixels += aleatoire.choice(couleurs) * aleatoire.randint(1, 40)
+        images[f'palette_{nombre_couleurs}'] = Image(largeur, hauteur, pixels[:nombre_pixels * 3])
+    return images
+
+
+def mesurer(fonction, repetitions=5):
+    """
+    Execute 'fonction' 'repetitions' fois et return la mediane des durées en nanosecondes (perf_counter_ns).
+    """
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter_ns()
+        fonction()
+        durees.append(time.perf_counter_ns() - debut)
+    return int(statistics.median(durees))
+
+
+def memoire_max(fonction):
+    """
+    Execute 'fonction' une fois sous tracemalloc et return le pic de memoire allouée en bytes. Cette mesure est faite
+    à part des mesures de durée car tracemalloc ralentit fortement les allocations.
+    """
+    tracemalloc.start()
+    try:
+        fonction()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def mo_par_seconde(taille, duree_ns):
+    return taille / 1e6 / (duree_ns / 1e9) if duree_ns else 0.0
+
+
+def benchmark_image(image, dossier, repetitions=5, variantes=VARIANTES):
+    """
+    Mesure chaque variante du format sur une image : taille encodée, ratio de compression (taille brute / taille
+    encodée), mediane des durées d'encodage et de decodage, debits en Mo/s (rapportés à la taille brute de l'image,
+    3 bytes par pixel) et pic de memoire, à coté de la taille et du coût estimés par Encoder.auto (voir
+    estimation.py). Une variante impossible pour cette image (palette trop grande pour la profondeur) est notée avec
+    son erreur. Return la liste des resultats.
+    """
+    taille_brute = image.get_width() * image.get_height() * 3
+    estimations = {estimation['variante']: estimation for estimation in estimer_variantes(statistiques(image))}
+    resultats = []
+    for nom, version, options in variantes:
+        path = os.path.join(dossier, nom + '.ulbmp')
+        resultat = {'variante': nom}
+        try:
+            Encoder(image, version, **options).save_to(path)
+        except ValueError as erreur:
+            resultat['erreur'] = str(erreur)
+            resultats.append(resultat)
+            continue
+        decodee = Decoder.load_from(path)
+        if decodee != image:
+            raise Exception(f'{nom} does not round-trip: {image.diff(decodee)}')
+        encodage = mesurer(lambda: Encoder(image, version, **options).save_to(path), repetitions)
+        decodage = mesurer(lambda: Decoder.load_from(path), repetitions)
+        taille = os.path.getsize(path)
+        resultat.update({
+            'taille': taille,
+            'ratio': taille_brute / taille,
+            'encodage_ns': encodage,
+            'decodage_ns': decodage,
+            'encodage_mo_s': mo_par_seconde(taille_brute, encodage),
+            'decodage_mo_s': mo_par_seconde(taille_brute, decodage),
+            'encodage_memoire_max': memoire_max(lambda: Encoder(image, version, **options).save_to(path)),
+            'decodage_memoire_max': memoire_max(lambda: Decoder.load_from(path)),
+        })
+        if nom in estimations:
+            resultat['taille_estimee'] = estimations[nom]['taille']
+            resultat['cout_estime_ns'] = estimations[nom]['cout_ns']
+        resultats.append(resultat)
+    return resultats
+
+
+def benchmark_pixels(image, repetitions=5):
+    """
+    Mesure l'accès aux pixels sous forme d'objets Pixel (liste de tous les pixels de Image.get_pixels, puis pixels
+    uniques) : mediane des durées et pic de memoire de la liste complete. Return un dictionnaire.
+    """
+    pixels = image.get_pixels()
+    return {
+        'liste_ns': mesurer(lambda: list(pixels), repetitions),
+        'liste_memoire_max': memoire_max(lambda: list(pixels)),
+        'uniques_ns': mesurer(image.get_unique_pixels, repetitions),
+    }
+
+
+def benchmark_workers(image, dossier, workers_max, repetitions=5):
+    """
+    Passage à l'echelle de l'encodage et du decodage en plusieurs processus : pour chaque format decoupable (la
+    version 4 avec un index des lignes, voir Encoder et decode_parallele), mediane des durées de 1 à 'workers_max'
+    processus et acceleration par rapport à un seul. Return la liste des resultats.
+    """
+    taille_brute = image.get_width() * image.get_height() * 3
+    resultats = []
+    for nom, version, options in [('v1', 1, {}), ('v2', 2, {}), ('v3_d8', 3, {'depth': 8, 'rle': False}),
+                                  ('v3_d8_rle', 3, {'depth': 8, 'rle': True}), ('v4', 4, {'index': 16})]:
+        path = os.path.join(dossier, nom + '.ulbmp')
+        try:
+            Encoder(image, version, **options).save_to(path)
+        except ValueError:
+            continue
+        for workers in range(1, workers_max + 1):
+            encodage = mesurer(lambda: Encoder(image, version, workers=workers, **options).save_to(path), repetitions)
+            decodage = mesurer(lambda: Decoder.load_from(path, workers=workers), repetitions)
+            if workers == 1:
+                reference = (encodage, decodage)
+            resultats.append({
+                'variante': nom,
+                'workers': workers,
+                'encodage_ns': encodage,
+                'decodage_ns': decodage,
+                'encodage_mo_s': mo_par_seconde(taille_brute, encodage),
+                'decodage_mo_s': mo_par_seconde(taille_brute, decodage),
+                'encodage_acceleration': reference[0] / encodage,
+                'decodage_acceleration': reference[1] / decodage,
+            })
+    return resultats
+
+
+def verifier_backends(images, afficher=print):
+    """
+    Encode et decode chaque image dans chaque variante avec le backend de reference ('python') puis avec le backend
+    NumPy, et verifie que les fichiers produits sont identiques bytes par bytes et que les images decodées sont les
+    memes. Return le nombre de differences (0 si NumPy n'est pas installé, rien n'est alors comparé).
+    """
+    if backend.charger_numpy() is None:
+        afficher('NumPy is not installed, only the python backend is available')
+        return 0
+    differences = 0
+    with tempfile.TemporaryDirectory() as dossier:
+        for nom, image in images.items():
+            for variante, version, options in VARIANTES:
+                fichiers = {}
+                for nom_backend in ('python', 'numpy'):
+                    fichiers[nom_backend] = os.path.join(dossier, f'{variante}_{nom_backend}.ulbmp')
+                    with backend.utiliser_backend(nom_backend):
+                        try:
+                            Encoder(image, version, **options).save_to(fichiers[nom_backend])
+                        except ValueError:
+                            break
+                else:
+                    with open(fichiers['python'], 'rb') as python, open(fichiers['numpy'], 'rb') as numpy:
+                        identiques = python.read() == numpy.read()
+                    with backend.utiliser_backend('python'):
+                        reference = Decoder.load_from(fichiers['python'])
+                    with backend.utiliser_backend('numpy'):
+                        identiques = identiques and Decoder.load_from(fichiers['python']) == reference == image
+                    if not identiques:
+                        differences += 1
+                        afficher(f'{nom} {variante}: the python and numpy backends differ')
+    afficher(f'{differences} differences between the python and numpy backends')
+    return differences
+
+
+async def serveur_charge(fichiers, requetes, clients, executor, limite):
+    """
+    Lance le serveur local et les clients du test de charge dans la boucle courante (voir test_charge). Return les
+    latences des requetes en nanosecondes, la durée totale et le plus grand retard de la boucle.
+    """
+    semaphore = asyncio.Semaphore(limite)
+    connexions = set()
+
+    async def repondre(lecteur, ecrivain):
+        connexions.add(asyncio.current_task())
+        while ligne := await lecteur.readline():
+            image = await Decoder.aload(ligne.decode().strip(), executor, semaphore)
+            ecrivain.write(f'{image.get_width()} {image.get_height()}\n'.encode())
+            await ecrivain.drain()
+        ecrivain.close()
+
+    async def client(numero, latences):
+        lecteur, ecrivain = await asyncio.open_connection(*serveur.sockets[0].getsockname()[:2])
+        for requete in range(numero, requetes, clients):
+            debut = time.perf_counter_ns()
+            ecrivain.write(fichiers[requete % len(fichiers)].encode() + b'\n')
+            await lecteur.readline()
+            latences.append(time.perf_counter_ns() - debut)
+        ecrivain.close()
+        await ecrivain.wait_closed()
+
+    retards = [0]
+
+    async def surveiller_boucle():
+        while True:
+            debut = time.perf_counter_ns()
+            await asyncio.sleep(0.001)
+            retards[0] = max(retards[0], time.perf_counter_ns() - debut - 1_000_000)
+
+    serveur = await asyncio.start_server(repondre, '127.0.0.1', 0)
+    surveillance = asyncio.create_task(surveiller_boucle())
+    latences = []
+    debut = time.perf_counter_ns()
+    async with serveur:
+        await asyncio.gather(*(client(numero, latences) for numero in range(clients)))
+        await asyncio.gather(*connexions)
+    duree = time.perf_counter_ns() - debut
+    surveillance.cancel()
+    return latences, duree, retards[0]
+
+
+def test_charge(fichiers, requetes=200, clients=16, executor='thread', workers=4, limite=4):
+    """
+    Test de charge de Decoder.aload : un serveur asyncio local (127.0.0.1, port libre) decode le fichier dont le
+    chemin arrive sur chaque ligne et repond la largeur et la hauteur de l'image, 'clients' connexions envoient
+    'requetes' requetes au total, chacune attendant sa reponse avant la suivante. Les decodages sont faits dans un
+    pool de 'workers' threads ou processus, au plus 'limite' à la fois. Une tache qui dort 1 ms en boucle mesure le
+    plus grand retard de la boucle du serveur, qui reste faible si la boucle n'est jamais bloquée. Return les
+    latences p50 et p99 en ms, le nombre de requetes par seconde et le retard maximal de la boucle en ms.
+    """
+    if executor == 'process':
+        # 'spawn' : un fork pendant que les threads de la boucle lisent des fichiers pourrait bloquer les processus fils
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    else:
+        pool = ThreadPoolExecutor(workers)
+    with pool:
+        latences, duree, retard = asyncio.run(serveur_charge(fichiers, requetes, clients, pool, limite))
+    centiles = statistics.quantiles(latences, n=100, method='inclusive')
+    return {
+        'requetes': requetes,
+        'clients': clients,
+        'executor': executor,
+        'workers': workers,
+        'limite': limite,
+        'p50_ms': centiles[49] / 1e6,
+        'p99_ms': centiles[98] / 1e6,
+        'requetes_par_s': requetes / (duree / 1e9),
+        'retard_boucle_max_ms': retard / 1e6,
+    }
+
+
+def version_git():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executer(images, repetitions=5, afficher=print, workers_max=1):
+    """
+    Lance le banc d'essai sur un dictionnaire nom -> Image et return le rapport complet (contexte d'execution et
+    resultats par image et par variante), pret à etre écrit en JSON. Avec workers_max > 1, le passage à l'echelle
+    en plusieurs processus est mesuré sur la plus grande des images.
+    """
+    rapport = {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': version_git(),
+        'python': sys.version.split()[0],
+        'plateforme': platform.platform(),
+        'backend': backend.nom_backend(),
+        'repetitions': repetitions,
+        'images': {},
+    }
+    with tempfile.TemporaryDirectory() as dossier:
+        for nom, image in images.items():
+            resultats = benchmark_image(image, dossier, repetitions)
+            rapport['images'][nom] = {'largeur': image.get_width(), 'hauteur': image.get_height(),
+                                      'resultats': resultats, 'pixels': benchmark_pixels(image, repetitions)}
+            for resultat in resultats:
+                if 'erreur' in resultat:
+                    continue
+                afficher(f"{nom:>12} {resultat['variante']:>11} | {resultat['taille']:>9} B "
+                         f"x{resultat['ratio']:<6.2f} | enc {resultat['encodage_ns'] / 1e6:8.1f} ms "
+                         f"{resultat['encodage_mo_s']:7.1f} MB/s | dec {resultat['decodage_ns'] / 1e6:8.1f} ms "
+                         f"{resultat['decodage_mo_s']:7.1f} MB/s")
+        if workers_max > 1 and images:
+            nom = max(images, key=lambda nom: images[nom].get_width() * images[nom].get_height())
+            rapport['workers'] = {'image': nom,
+                                  'resultats': benchmark_workers(images[nom], dossier, workers_max, repetitions)}
+            for resultat in rapport['workers']['resultats']:
+                afficher(f"{nom:>12} {resultat['variante']:>11} | {resultat['workers']:>2} workers | "
+                         f"enc {resultat['encodage_ns'] / 1e6:8.1f} ms x{resultat['encodage_acceleration']:<5.2f} | "
+                         f"dec {resultat['decodage_ns'] / 1e6:8.1f} ms x{resultat['decodage_acceleration']:<5.2f}")
+    return rapport
+
+
+def comparer(ancien, nouveau, afficher=print, seuil=0.10):
+    """
+    Compare deux rapports JSON et affiche les variantes dont la taille a changé ou dont la durée d'encodage ou de
+    decodage a varié de plus de 'seuil' (10 % par defaut). Return le nombre de regressions (plus lent ou plus gros).
+    """
+    regressions = 0
+    for nom, image in nouveau['images'].items():
+        anciens = {r['variante']: r for r in ancien['images'].get(nom, {}).get('resultats', [])}
+        for resultat in image['resultats']:
+            avant = anciens.get(resultat['variante'])
+            if avant is None or 'erreur' in avant or 'erreur' in resultat:
+                continue
+            for cle in ('taille', 'encodage_ns', 'decodage_ns'):
+                variation = resultat[cle] / avant[cle] - 1 if avant[cle] else 0.0
+                if (cle == 'taille' and variation != 0) or abs(variation) > seuil:
+                    regressions += variation > 0
+                    afficher(f"{nom} {resultat['variante']} {cle}: {avant[cle]} -> {resultat[cle]} "
+                             f"({variation * 100:+.1f} %)")
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai des variantes du format ULBMP")
+    parser.add_argument('-o', '--output', default='benchmark.json', help='fichier JSON des resultats')
+    parser.add_argument('-r', '--repetitions', type=int, default=5)
+    parser.add_argument('--size', type=int, default=256, help='cote des images synthetiques')
+    parser.add_argument('--no-corpus', action='store_true', help="n'utilise pas images_rapport")
+    parser.add_argument('--no-synthetic', action='store_true', help="n'utilise pas les images synthetiques")
+    parser.add_argument('--compare', help='rapport JSON precedent à comparer avec ce lancement')
+    parser.add_argument('--check-backends', action='store_true', help='compare les backends python et numpy')
+    parser.add_argument('--workers', type=int, default=1, help='mesure le passage à l\'echelle de 1 à N processus')
+    parser.add_argument('--load-test', type=int, metavar='REQUETES', help='test de charge de Decoder.aload')
+    parser.add_argument('--clients', type=int, default=16, help='connexions simultanées du test de charge')
+    parser.add_argument('--executor', choices=('thread', 'process'), default='thread')
+    arguments = parser.parse_args(arguments)
+    if arguments.load_test:
+        fichiers = [os.path.join('images_rapport', nom, nom + '.ulbmp') for nom in sorted(os.listdir('images_rapport'))]
+        resultat = test_charge(fichiers, arguments.load_test, arguments.clients, arguments.executor,
+                               os.cpu_count() or 1)
+        print(json.dumps(resultat, indent=2))
+        return 0
+    images = {}
+    if not arguments.no_corpus:
+        images.update(images_corpus())
+    if not arguments.no_synthetic:
+        images.update(images_synthetiques(arguments.size, arguments.size))
+    if arguments.check_backends:
+        return 1 if verifier_backends(images) else 0
+    rapport = executer(images, arguments.repetitions, workers_max=arguments.workers)
+    with open(arguments.output, 'w') as file:
+        json.dump(rapport, file, indent=2)
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            return 1 if comparer(json.load(file), rapport) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Lecture et écriture des fichiers BMP 24 bits non compressés (les originaux de images_rapport), directement depuis et
+vers le buffer RGB de Image.
+"""
+
+from image import Image
+
+
+class BmpEncoder:
+    def __init__(self, img: Image):
+        self.image = img
+        self.largeur = img.get_width()
+        self.hauteur = img.get_height()
+
+    def save_to(self, path: str) -> None:
+        """
+        Ecrit l'image en BMP 24 bits : header de fichier (14 bytes), header BITMAPINFOHEADER (40 bytes), puis les
+        lignes de bas en haut, chaque pixel en ordre B, G, R et chaque ligne completée par des bytes nuls jusqu'à un
+        multiple de 4 bytes. Les canaux sont permutés en une fois sur tout le buffer, les lignes sont ensuite écrites
+        par tranches de memoryview sans copie supplementaire.
+        """
+        taille_ligne = self.largeur * 3
+        padding = bytes(-taille_ligne % 4)
+        taille_pixels = (taille_ligne + len(padding)) * self.hauteur
+        header = (b'BM' + (54 + taille_pixels).to_bytes(4, 'little') + bytes(4) + (54).to_bytes(4, 'little')
+                  + (40).to_bytes(4, 'little') + self.largeur.to_bytes(4, 'little')
+                  + self.hauteur.to_bytes(4, 'little') + (1).to_bytes(2, 'little') + (24).to_bytes(2, 'little')
+                  + bytes(4) + taille_pixels.to_bytes(4, 'little') + (2835).to_bytes(4, 'little') * 2 + bytes(8))
+        bgr = rgb_vers_bgr(self.image.get_buffer())
+        lignes = memoryview(bgr)
+        with open(path, 'wb') as file:
+            file.write(header)
+            for y in range(self.hauteur - 1, -1, -1):
+                file.write(lignes[y * taille_ligne:(y + 1) * taille_ligne])
+                file.write(padding)
+
+
+class BmpDecoder:
+    @staticmethod
+    def load_from(path: str):
+        """
+        Lit un fichier BMP 24 bits non compressé (tous les headers d'informations à partir de BITMAPINFOHEADER sont
+        acceptés, seuls leurs 40 premiers bytes sont utilisés), prend les lignes dans l'ordre de l'image (de bas en
+        haut si la hauteur est positive, de haut en bas sinon) en sautant le padding de chaque ligne, puis permute les
+        canaux B, G, R en R, G, B. Return l'image.
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:2] != b'BM' or len(data) < 54:
+            raise Exception('Incorrect format')
+        debut_pixels = int.from_bytes(data[10:14], 'little')
+        taille_info = int.from_bytes(data[14:18], 'little')
+        largeur = int.from_bytes(data[18:22], 'little', signed=True)
+        hauteur = int.from_bytes(data[22:26], 'little', signed=True)
+        bits = int.from_bytes(data[28:30], 'little')
+        compression = int.from_bytes(data[30:34], 'little')
+        if taille_info < 40 or bits != 24 or compression != 0 or largeur < 0:
+            raise ValueError('Only uncompressed 24-bit BMP files are supported')
+        taille_ligne = largeur * 3
+        pas = taille_ligne + (-taille_ligne % 4)
+        if debut_pixels + pas * abs(hauteur) > len(data):
+            raise Exception('Incorrect format')
+        pixels = memoryview(data)[debut_pixels:debut_pixels + pas * abs(hauteur)]
+        ordre = range(abs(hauteur)) if hauteur < 0 else range(abs(hauteur) - 1, -1, -1)
+        if hauteur < 0 and pas == taille_ligne:
+            bgr = pixels
+        else:
+            bgr = b''.join([pixels[y * pas:y * pas + taille_ligne] for y in ordre])
+        return Image(largeur, abs(hauteur), rgb_vers_bgr(bgr))
+
+
+def rgb_vers_bgr(buffer):
+    """
+    Permute le premier et le troisieme canal de chaque pixel (RGB vers BGR, et inversement) par trois affectations
+    de tranches. Return un nouveau bytearray.
+    """
+    permute = bytearray(len(buffer))
+    permute[0::3], permute[1::3], permute[2::3] = buffer[2::3], buffer[1::3], buffer[0::3]
+    return permute
@@ -0,0 +1,105 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Cache LRU des images decodées, devant Decoder.load_from :
+    cache = CacheImages(budget=64 << 20)
+    image = cache.load_from('images_rapport/monkey/monkey.ulbmp')  # decodage
+    image = cache.load_from('images_rapport/monkey/monkey.ulbmp')  # un os.stat, pas de decodage
+    cache.as_dict()  # {'hits': 1, 'misses': 1, 'evictions': 0, 'images': 1, 'bytes': ..., 'budget': ...}
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from encoding import Decoder
+from image import Image
+
+
+class CacheImages:
+    def __init__(self, budget=64 << 20, partager=False):
+        """
+        Cache des images decodées, associées à leur fichier par la clé (taille, date de modification, inode) lue avec
+        os.stat : un fichier réécrit ou remplacé n'est donc jamais servi depuis le cache. La taille du cache est
+        limitée à 'budget' bytes de buffers RGB (et non à un nombre d'images), les images les moins recemment
+        utilisées sont retirées quand le budget est depassé, une image plus grande que le budget n'est pas gardée.
+        Sans partage, chaque appel renvoie une copie de l'image (une copie du buffer, bien moins chere qu'un
+        decodage). Avec partager=True, tous les appelants reçoivent la meme Image, qu'ils ne doivent pas modifier :
+        une image partagée modifiée par __setitem__ est detectée et decodée à nouveau, pas une modification directe
+        de son buffer. Le cache peut etre utilisé par plusieurs threads.
+        """
+        if budget < 0:
+            raise ValueError('The cache budget must be positive')
+        self.budget = budget
+        self.partager = partager
+        self.images = OrderedDict()
+        self.taille = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verrou = threading.Lock()
+
+    def load_from(self, path: str, workers=1):
+        """
+        Return l'image du fichier donné, depuis le cache si le fichier n'a pas changé depuis son decodage, sinon
+        decodée par Decoder.load_from (avec 'workers' processus) puis ajoutée au cache.
+        """
+        infos = os.stat(path)
+        chemin = os.path.abspath(path)
+        cle = (infos.st_size, infos.st_mtime_ns, infos.st_ino)
+        with self.verrou:
+            entree = self.images.get(chemin)
+            if entree is not None and entree[0] == cle and entree[1].get_modification() == entree[2]:
+                self.images.move_to_end(chemin)
+                self.hits += 1
+                return self.servir(entree[1])
+            self.misses += 1
+        image = Decoder.load_from(path, workers)
+        with self.verrou:
+            self.retirer(chemin)
+            if len(image.get_buffer()) <= self.budget:
+                self.images[chemin] = (cle, image, image.get_modification())
+                self.taille += len(image.get_buffer())
+                while self.taille > self.budget:
+                    self.retirer(next(iter(self.images)))
+                    self.evictions += 1
+        return self.servir(image)
+
+    def servir(self, image):
+        if self.partager:
+            return image
+        return Image(image.get_width(), image.get_height(), bytearray(image.get_buffer()))
+
+    def retirer(self, chemin):
+        entree = self.images.pop(chemin, None)
+        if entree is not None:
+            self.taille -= len(entree[1].get_buffer())
+
+    def invalider(self, path=None):
+        """
+        Retire l'image du fichier donné du cache, ou toutes les images sans parametre.
+        """
+        with self.verrou:
+            if path is None:
+                self.images.clear()
+                self.taille = 0
+            else:
+                self.retirer(os.path.abspath(path))
+
+    def as_dict(self):
+        """
+        Return les compteurs du cache (hits, misses, images retirées pour respecter le budget), le nombre d'images
+        gardées et la taille de leurs buffers en bytes.
+        """
+        with self.verrou:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'images': len(self.images),
+                'bytes': self.taille,
+                'budget': self.budget,
+            }
@@ -0,0 +1,56 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Statistiques des couleurs d'un buffer RGB : couleurs uniques, comptage borné et histogramme. Les couleurs sont des
+entiers 24 bits 0xRRGGBB (voir image.entiers_rgb), hashés bien plus vite que des Pixel ou des tuples.
+"""
+
+from collections import Counter
+
+from image import entiers_rgb
+
+TAILLE_LOT = 1 << 16
+
+
+def couleurs_uniques(buffer, limite=None, taille_lot=TAILLE_LOT):
+    """
+    Return la liste des couleurs uniques du buffer dans l'ordre de leur premiere apparition, ordre qui ne depend que
+    de l'image (contrairement à celui d'un set) et rend la palette de la version 3 reproductible. Les pixels sont
+    ajoutés par lots de 'taille_lot' à un dictionnaire qui garde l'ordre d'insertion. Avec une limite, le parcours
+    s'arrete au premier lot qui la depasse : la liste contient alors plus de 'limite' couleurs mais pas forcement
+    toutes.
+    """
+    entiers = entiers_rgb(buffer)
+    couleurs = {}
+    for debut in range(0, len(entiers), taille_lot):
+        couleurs.update(dict.fromkeys(entiers[debut:debut + taille_lot]))
+        if limite is not None and len(couleurs) > limite:
+            break
+    return list(couleurs)
+
+
+def nombre_couleurs(buffer, limite=None):
+    """
+    Return le nombre de couleurs uniques du buffer, ou limite + 1 dès que la limite est depassée.
+    """
+    nombre = len(couleurs_uniques(buffer, limite))
+    return nombre if limite is None else min(nombre, limite + 1)
+
+
+def depasse(buffer, limite):
+    """
+    Return True si le buffer contient plus de 'limite' couleurs (par exemple 2 ** profondeur pour savoir si une
+    palette tient dans une profondeur), sans compter les couleurs au-delà.
+    """
+    return len(couleurs_uniques(buffer, limite)) > limite
+
+
+def histogramme(buffer):
+    """
+    Return l'histogramme des couleurs du buffer : un Counter couleur 0xRRGGBB -> nombre de pixels, dans l'ordre de
+    premiere apparition des couleurs.
+    """
+    return Counter(entiers_rgb(buffer))
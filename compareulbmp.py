@@ -1,49 +1,102 @@
-from encoding import *
-import os
-import time
-
-
-def time_loading(paths):
-    for path in paths:
-        start = time.time()
-        image = Decoder.load_from(path)
-        end = time.time()
-        vitesse = (end - start) * 1000
-        print(f"{path} >> {vitesse} ms")
-
-
-def time_encoding(base_path, v3=True):
-    print(base_path)
-    image_test = Decoder.load_from(base_path)
-
-    paths = ["1", "2", "4"]
-    if v3:
-        paths += ["3rle", "3norle"]
-    for path in paths:
-        version = int(path[0])
-        if version in (1, 2, 4):
-            start = time.time()
-            Encoder(image_test, version).save_to(path + ".ulbmp")
-            end = time.time()
-        else:
-            RLE = True if path[1:] == "rle" else False
-            start = time.time()
-            Encoder(image_test, 3, depth=8, rle=RLE).save_to(path + ".ulbmp")
-            end = time.time()
-        vitesse = (end - start)
-        print(f"{path} >> {vitesse} s")
-        os.remove(path + ".ulbmp")
-
-
-def compression_ratio(paths):
-    size = os.path.getsize(paths[0])
-    print("base size (v1) >> ", size, "\n")
-    for path in paths[1:]:
-        print(f"{path} : size >> {os.path.getsize(path)} | ratio >> {(size / os.path.getsize(path)) * 100}")
-
-
-checkers = ["checkers.ulbmp", "checkers2.ulbmp", "checkers3_1.ulbmp", "checkers3_2.ulbmp", "checkers3_4.ulbmp",
-            "checkers3_8_norle.ulbmp", "checkers3_8_rle.ulbmp", "checkers4.ulbmp"]
-airplanes = ["airplane.ulbmp", "airplane2.ulbmp", "airplane4.ulbmp"]
-mercures = ["mercure.ulbmp", "mercure2.ulbmp", "mercure3_8_no_rle.ulbmp", "mercure3_8_rle.ulbmp", "mercure4.ulbmp"]
-monkeys = ["monkey.ulbmp", "monkey2.ulbmp", "monkey3_8_norle.ulbmp", "monkey3_8_rle.ulbmp", "monkey4.ulbmp"]
+from benchmark import VARIANTES, mesurer
+from bmp import BmpDecoder
+from encoding import *
+from pixel import Pixel
+import os
+import statistics
+import tempfile
+import time
+
+
+def time_loading(paths, repetitions=5):
+    """
+    Mediane de 'repetitions' chargements de chaque fichier (ULBMP ou BMP), voir benchmark.py pour le banc complet.
+    """
+    for path in paths:
+        charger = (lambda: BmpDecoder.load_from(path)) if path.endswith('.bmp') else lambda: Decoder.load_from(path)
+        print(f"{path} >> {mesurer(charger, repetitions) / 1e6:.1f} ms")
+
+
+def time_encoding(base_path, v3=True, repetitions=5):
+    """
+    Mediane de 'repetitions' encodages de l'image de 'base_path' dans chaque version (et en version 3 profondeur 8,
+    avec et sans RLE), voir benchmark.py pour toutes les combinaisons version/profondeur/RLE.
+    """
+    print(base_path)
+    image_test = Decoder.load_from(base_path)
+    variantes = [variante for variante in VARIANTES if variante[1] != 3 or (v3 and variante[2]['depth'] == 8)]
+    with tempfile.TemporaryDirectory() as dossier:  # dossier propre à l'appel, pas de collision entre deux mesures
+        for nom, version, options in variantes:
+            sortie = os.path.join(dossier, nom + ".ulbmp")
+            duree = mesurer(lambda: Encoder(image_test, version, **options).save_to(sortie), repetitions)
+            print(f"{nom} >> {duree / 1e6:.1f} ms")
+
+
+def decode_v4_branches(bytes_pixels):
+    """
+    Ancien decodage de la version 4 (comparaisons successives sur byte0 et un tuple par pixel), gardé uniquement comme
+    reference pour mesurer le gain du decodage par tables de encoding.decode_pixels_v4.
+    """
+    pixels, i, (r, g, b) = [], 0, (0, 0, 0)
+    while i < len(bytes_pixels):
+        byte0 = bytes_pixels[i]
+        if byte0 == 255:
+            r, g, b = bytes_pixels[i + 1], bytes_pixels[i + 2], bytes_pixels[i + 3]
+            i += 4
+        elif byte0 >> 6 == 0:
+            r, g, b = r + ((byte0 >> 4) & 0b11) - 2, g + ((byte0 >> 2) & 0b11) - 2, b + (byte0 & 0b11) - 2
+            i += 1
+        elif byte0 >> 6 == 1:
+            dg = (byte0 & 0b111111) - 32
+            r, g, b = r + (bytes_pixels[i + 1] >> 4) - 8 + dg, g + dg, b + (bytes_pixels[i + 1] & 0b1111) - 8 + dg
+            i += 2
+        else:
+            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
+            d1 = (((byte0 & 0b1111) << 4) | (byte1 >> 4)) - 128
+            d2 = (((byte1 & 0b1111) << 2) | (byte2 >> 6)) - 32 + d1
+            d3 = (byte2 & 0b111111) - 32 + d1
+            if byte0 >> 4 == 8:
+                r, g, b = r + d1, g + d2, b + d3
+            elif byte0 >> 4 == 9:
+                r, g, b = r + d2, g + d1, b + d3
+            else:
+                r, g, b = r + d2, g + d3, b + d1
+            i += 3
+        pixels.append(Pixel(r, g, b))
+    return pixels
+
+
+def compare_v4_decoders(paths, repetitions=5):
+    """
+    Compare le decodage par tables de la version 4 avec l'ancien decodage, mediane de 'repetitions' mesures.
+    """
+    for path in paths:
+        with open(path, 'rb') as file:
+            bytes_pixels = file.read()[12:]
+        temps_tables, temps_branches = [], []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            decode_pixels_v4(bytes_pixels, bytearray())
+            temps_tables.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            decode_v4_branches(bytes_pixels)
+            temps_branches.append(time.perf_counter() - start)
+        tables, branches = statistics.median(temps_tables), statistics.median(temps_branches)
+        print(f"{path} >> tables {tables * 1000:.1f} ms | branches {branches * 1000:.1f} ms | x{branches / tables:.2f}")
+
+
+def compression_ratio(paths):
+    size = os.path.getsize(paths[0])
+    print("base size (v1) >> ", size, "\n")
+    for path in paths[1:]:
+        taille = os.path.getsize(path)
+        print(f"{path} : size >> {taille} | ratio >> x{size / taille:.2f} | {taille / size * 100:.1f} % of v1")
+
+
+checkers = ["checkers.ulbmp", "checkers2.ulbmp", "checkers3_1.ulbmp", "checkers3_2.ulbmp", "checkers3_4.ulbmp",
+            "checkers3_8_norle.ulbmp", "checkers3_8_rle.ulbmp", "checkers4.ulbmp"]
+airplanes = ["airplane.ulbmp", "airplane2.ulbmp", "airplane4.ulbmp"]
+mercures = ["mercure.ulbmp", "mercure2.ulbmp", "mercure3_8_no_rle.ulbmp", "mercure3_8_rle.ulbmp", "mercure4.ulbmp"]
+monkeys = ["monkey.ulbmp", "monkey2.ulbmp", "monkey3_8_norle.ulbmp", "monkey3_8_rle.ulbmp", "monkey4.ulbmp"]
+v4 = ["images_rapport/airplane/airplane4.ulbmp", "images_rapport/checkers/checkers4.ulbmp",
+      "images_rapport/mercure/mercure4.ulbmp", "images_rapport/monkey/monkey4.ulbmp"]
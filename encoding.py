@@ -1,470 +1,1437 @@
-"""
-NOM : Saou
-PRÉNOM : Ayman
-SECTION : B1-INFO
-MATRICULE : 000593526
-"""
-
-from image import Image
-from pixel import Pixel
-
-
-class Encoder:
-    def __init__(self, img: Image, version_format=1, **kwargs):
-        self.image = img
-        self.largeur = img.get_width()
-        self.hauteur = img.get_height()
-        self.version = version_format
-        if self.version == 3 and ('rle' not in kwargs or 'depth' not in kwargs):
-            raise ValueError
-        self.profondeur = kwargs.get('depth')
-        self.rle = kwargs.get('rle')
-        self.nombre_pixels = self.largeur * self.hauteur
-
-    def save_to(self, path: str) -> None:
-        """
-        Ouvre le fichier donné par le path en parametre, compose le header en bytes à partir des donnees de l'image,
-        puis appelle differentes fonctions pour composer la suite de bytes representant les pixels en fonction de
-        la version, écrit le header et les bytes representant les pixels dans le fichier.
-        """
-        with open(path, 'wb') as file:
-            ulbmp_ascii = b'ULBMP'
-            version = self.version.to_bytes(1)
-            bytes_header = (12).to_bytes(2, 'little')
-            largeur = self.largeur.to_bytes(2, 'little')
-            hauteur = self.hauteur.to_bytes(2, 'little')
-            header = ulbmp_ascii + version + bytes_header + largeur + hauteur
-            if self.version == 1:
-                pixels_to_encode = self.encode_pixels_v1()
-            elif self.version == 2:
-                pixels_to_encode = self.encode_pixels_v2()
-            elif self.version == 3:
-                profondeur = self.profondeur.to_bytes(1)
-                rle = b'\x01' if self.rle and self.profondeur in (8, 24) else b'\x00'
-                bytes_header = (14).to_bytes(2, 'little')
-                header += profondeur + rle
-                pixels_to_encode, header = self.encode_pixels_v3(header, bytes_header, rle)
-            elif self.version == 4:
-                pixels_to_encode = self.encode_pixels_v4()
-            file.write(header + pixels_to_encode)
-
-    def encode_pixels_v1(self):
-        """
-        Encodage de la version 1 du format ULBMP, parcourt la liste de pixels de l'image et encode l'intensité des
-        canaux RGB sur un byte chacun. Return les bytes associés aux pixels.
-        """
-        pixels_to_encode = b''
-        liste_pixels = self.image.get_pixels()
-        for pixel in liste_pixels:
-            pixels_to_encode += (pixel.get_red().to_bytes(1) + pixel.get_green().to_bytes(1) +
-                                 pixel.get_blue().to_bytes(1))
-        return pixels_to_encode
-
-    def encode_pixels_v2(self):
-        """
-        Encodage de la version 2 du format ULBMP, parcourt la liste de pixels de l'image en comparant chaque pixel avec
-        le precedent, si le pixel est le meme, continue de parcourir la liste et incremente la variable occurence,
-        si occurrence est à 255 ou que le pixel est different du precedent, encode l'occurence sur un byte suivi de
-        l'intensité des canaux RGB du pixel répeté sur un byte chacun. Return les bytes associés aux pixels.
-        """
-        pixels_to_encode = b''
-        liste_pixels = self.image.get_pixels()
-        pixel_prec = liste_pixels[0]
-        occurence = 1
-        compteur_pixels = 1
-        nombre_pixels = len(liste_pixels)
-        for pixel in liste_pixels[1:]:
-            compteur_pixels += 1
-            if pixel == pixel_prec:
-                occurence += 1
-                if occurence == 255:
-                    pixels_to_encode += (occurence.to_bytes(1) + pixel_prec.get_red().to_bytes(1) +
-                                         pixel_prec.get_green().to_bytes(1) + pixel_prec.get_blue().to_bytes(1))
-                    occurence = 0
-            if pixel != pixel_prec or nombre_pixels == compteur_pixels:
-                pixels_to_encode += (occurence.to_bytes(1) + pixel_prec.get_red().to_bytes(1) + pixel_prec.get_green()
-                                     .to_bytes(1)
-                                     + pixel_prec.get_blue().to_bytes(1))
-                occurence = 1
-                if nombre_pixels == compteur_pixels and pixel != pixel_prec:
-                    pixels_to_encode += (occurence.to_bytes(1) + pixel.get_red().to_bytes(1) +
-                                         pixel.get_green().to_bytes(1) + pixel.get_blue().to_bytes(1))
-            pixel_prec = pixel
-        return pixels_to_encode
-
-    def encode_pixels_v3(self, header, bytes_header, rle):
-        """
-        Encodage de la version 3 du format ULBMP, prend le header en parametre pour modifier sa taille en fonction de
-        la palette si la profondeur ≤ 8, dans le cas d'une profondeur 24, utilise l'encodage de la version 1 si le
-        RLE n'est pas activé, et l'encodage de la version 2 s'il l'est, pour une profondeur de 8, si le RLE n'est pas
-        activé parcourt la liste de pixels, et pour chaque pixel parcourt les clés et valeurs du dictionnaire de la
-        palette, si le pixel est égal à la valeur, encode sa clé associée (indice) en bytes dans la suite de bytes,
-        si le RLE est activé, utilise une derivée du code utilisé pour l'encodage de la version 2,
-        pour les profondeurs 1, 2 et 4, parcourt la liste de pixels, initialise une liste d'indices vide, encode les
-        indices lorsque qu'il y en a assez pour faire un byte ou qu'il n'y a plus de pixels à encoder, reinitialise la
-        liste d'indices
-        Return les pixels à encoder, et le header dans le cas ou il a été modifié si presence d'une palette.
-        """
-        liste_pixels = self.image.get_pixels()
-        binary_palette, liste_palette = self.get_palette()
-        pixels_to_encode = b''
-        if self.profondeur != 24:
-            bytes_header = (14 + (len(liste_palette) * 3)).to_bytes(2, 'little')
-            header += binary_palette
-        header = header[0:6] + bytes_header + header[8:]
-        if rle == b'\x00':
-            if self.profondeur == 24:
-                pixels_to_encode = self.encode_pixels_v1()
-            elif self.profondeur == 8:
-                for pixel in liste_pixels:
-                    indice_palette = self.get_indice_palette_from_pixel(liste_palette, pixel)
-                    pixels_to_encode += int.to_bytes(indice_palette)
-            elif self.profondeur in (1, 2, 4):
-                nombre_pixels = len(liste_pixels)
-                indices = []
-                for pixel in liste_pixels:
-                    indice_palette = self.get_indice_palette_from_pixel(liste_palette, pixel)
-                    indices.append(indice_palette)
-                    nombre_pixels -= 1
-                    if len(indices) == (8 // self.profondeur) or nombre_pixels == 0:  # nombre d'indices suffisant
-                        byte = 0
-                        for i in indices:
-                            byte = (byte << self.profondeur) | i
-                        if len(indices) != (8 // self.profondeur):
-                            # si on est rentré dans la condition parce que dernier pixel
-                            byte = byte << ((8 // self.profondeur) - len(indices))
-                        pixels_to_encode += int.to_bytes(byte)
-                        indices = []
-        elif rle == b'\x01':
-            if self.profondeur == 24:
-                pixels_to_encode = self.encode_pixels_v2()
-            elif self.profondeur == 8:
-                pixel_prec = liste_pixels[0]
-                occurence = 1
-                compteur_pixels = 1
-                nombre_pixels = len(liste_pixels)
-                for pixel in liste_pixels[1:]:
-                    compteur_pixels += 1
-                    if pixel == pixel_prec:
-                        occurence += 1
-                        if occurence == 255:
-                            indice_palette = self.get_indice_palette_from_pixel(liste_palette, pixel_prec)
-                            pixels_to_encode += occurence.to_bytes(1) + indice_palette.to_bytes(1)
-                            occurence = 0
-                    if pixel != pixel_prec or nombre_pixels == compteur_pixels:
-                        indice_palette = self.get_indice_palette_from_pixel(liste_palette, pixel_prec)
-                        pixels_to_encode += occurence.to_bytes(1) + indice_palette.to_bytes(1)
-                        occurence = 1
-                        if nombre_pixels == compteur_pixels and pixel != pixel_prec:
-                            indice_palette = self.get_indice_palette_from_pixel(liste_palette, pixel)
-                            pixels_to_encode += occurence.to_bytes(1) + indice_palette.to_bytes(1)
-                    pixel_prec = pixel
-        return pixels_to_encode, header
-
-    def encode_pixels_v4(self):
-        """
-        Encodage de la version 4 du format ULBMP, initialise un pixel noir comme pixel precedent, parcourt la liste
-        de pixels, calcule tous les deltas en fonction du pixel precedent, determine le type de bloc à encoder selon
-        les deltas, pour chaque bloc ajoute le nombre nécessaire pour que l'intensité des canaux RGB reste entre les
-        bornes 0 et 255, calcule les bytes à encoder puis les encode, definit le pixel comme pixel precedent a la fin
-        de la boucle. Return les pixels à encoder.
-        """
-        pixels_to_encode = b''
-        liste_pixels = self.image.get_pixels()
-        pixel_prec = Pixel(0, 0, 0)
-        for pixel in liste_pixels:
-            delta_red, delta_green, delta_blue = Pixel.get_delta(pixel_prec, pixel)
-            delta_rg, delta_bg = delta_red - delta_green, delta_blue - delta_green
-            delta_gr, delta_br = delta_green - delta_red, delta_blue - delta_red
-            delta_rb, delta_gb = delta_red - delta_blue, delta_green - delta_blue
-            diff = self.get_diff(delta_red, delta_green, delta_blue)
-            if diff[0] == 'small':
-                delta_red, delta_green, delta_blue = delta_red + 2, delta_green + 2, delta_blue + 2
-                byte0 = (((delta_red << 2) | delta_green) << 2) | delta_blue
-                pixels_to_encode += int.to_bytes(byte0)
-            elif diff[0] == 'intermediate':
-                delta_green, delta_rg, delta_bg = delta_green + 32, delta_rg + 8, delta_bg + 8
-                byte0 = 64 | delta_green
-                byte1 = (delta_rg << 4) | delta_bg
-                pixels_to_encode += int.to_bytes(byte0) + int.to_bytes(byte1)
-            elif diff[0] == 'big':
-                if diff[1] == 'r':
-                    byte0, byte1, byte2 = self.encode_big_diff(delta_red, delta_gr, delta_br, 128)
-                    pixels_to_encode += byte0 + byte1 + byte2
-                elif diff[1] == 'g':
-                    byte0, byte1, byte2 = self.encode_big_diff(delta_green, delta_rg, delta_bg, 144)
-                    pixels_to_encode += byte0 + byte1 + byte2
-                elif diff[1] == 'b':
-                    byte0, byte1, byte2 = self.encode_big_diff(delta_blue, delta_rb, delta_gb, 160)
-                    pixels_to_encode += byte0 + byte1 + byte2
-            elif diff[0] == 'new':
-                pixels_to_encode += (int.to_bytes(255) + int.to_bytes(pixel.get_red()) + int.to_bytes(pixel.get_green())
-                                     + int.to_bytes(pixel.get_blue()))
-            pixel_prec = pixel
-        return pixels_to_encode
-
-    def get_palette(self):
-        """
-        Convertit la liste de pixels de l'image en un set pour conserver uniquement les elements uniques,
-        puis convertit ce meme set en une liste pour profiter de l'usage des indices, pour chaque pixel dans cette
-        liste, convertit l'intensité de ses canaux RGB en bytes et l'ajoute dans 'palette_binaire' qui sera ajoutée
-        au header.
-        """
-        liste_palette = list(set(self.image.get_pixels()))
-        palette_binaire = b''
-        for pixel in liste_palette:
-            palette_binaire += pixel.get_red().to_bytes()
-            palette_binaire += pixel.get_green().to_bytes()
-            palette_binaire += pixel.get_blue().to_bytes()
-        return palette_binaire, liste_palette
-
-    @staticmethod
-    def get_indice_palette_from_pixel(palette, pixel_to_get):
-        """
-        Prend la representation en dictionnaire de la palette et un pixel en parametre, return l'indice associé a ce
-        pixel dans le dictionnaire de la palette.
-        """
-        for indice, pixel in enumerate(palette):
-            if pixel == pixel_to_get:
-                return indice
-
-    @staticmethod
-    def get_diff(delta_r, delta_g, delta_b):
-        """
-        Prend en parametre la difference d'intensité des canaux RGB entre deux pixels et return une liste diff qui
-        contient le type de blocs en indice 0, et le type de couleur en indice 1 si le bloc est un bloc BIG_DIFF.
-        """
-        diff = ['', '']
-        if -2 <= delta_r <= 1 and -2 <= delta_g <= 1 and -2 <= delta_b <= 1:
-            diff[0] = 'small'
-        elif -32 <= delta_g <= 31 and (-8 <= (delta_r - delta_g) <= 7 and -8 <= (delta_b - delta_g) <= 7):
-            diff[0] = 'intermediate'
-        elif -128 <= delta_r <= 127 and (-32 <= (delta_g - delta_r) <= 31 and -32 <= (delta_b - delta_r) <= 31):
-            diff[0], diff[1] = 'big', 'r'
-        elif -128 <= delta_g <= 127 and (-32 <= (delta_r - delta_g) <= 31 and -32 <= (delta_b - delta_g) <= 31):
-            diff[0], diff[1] = 'big', 'g'
-        elif -128 <= delta_b <= 127 and (-32 <= (delta_r - delta_b) <= 31 and -32 <= (delta_g - delta_b) <= 31):
-            diff[0], diff[1] = 'big', 'b'
-        else:
-            diff[0] = 'new'
-        return diff
-
-    @staticmethod
-    def encode_big_diff(delta1, delta2, delta3, signature):
-        """
-        Fonction qui generalise l'encodage d'un bloc 'BIG_DIFF', prend en parametre les 3 deltas et les 4 bits
-        permettant d'identifier le type de bloc, return les 3 bytes à encoder du bloc.
-        """
-        delta1, delta2, delta3 = delta1 + 128, delta2 + 32, delta3 + 32
-        byte0 = signature + (delta1 >> 4)
-        byte1 = ((delta1 & 0b1111) << 4) | (delta2 >> 2)
-        byte2 = ((delta2 & 0b11) << 6) | delta3
-        return int.to_bytes(byte0), int.to_bytes(byte1), int.to_bytes(byte2)
-
-
-class Decoder:
-    @staticmethod
-    def load_from(path: str):
-        """
-        Lit le contenu dans le fichier donné par le path en parametre recupere la largeur et la hauteur de l'image,
-        delimite la partie liée a la palette et celle aux pixels pour la version 3 du format, initialise une liste de
-        pixels vide, construit la liste de pixels selon la version du format et return l'image definie par la largeur,
-        la hauteur et la liste de pixels.
-        """
-        with open(path, 'rb') as file:
-            data = file.read()
-            version = data[5]
-            header = data[:6]
-            width_and_height = data[8:12]
-            expected_header = bytes.fromhex(f'554c424d500{version}')
-            if header != expected_header or len(width_and_height) != 4:
-                raise Exception('Incorrect format')
-            largeur = int.from_bytes(width_and_height[0:2], 'little')
-            hauteur = int.from_bytes(width_and_height[2:], 'little')
-            pixels_expected = largeur * hauteur
-            bytes_pixels = data[12:]
-            liste_pixels = []
-            if version == 1:
-                liste_pixels = decode_pixels_v1(bytes_pixels, liste_pixels)
-            elif version == 2:
-                liste_pixels = decode_pixels_v2(bytes_pixels, liste_pixels)
-            elif version == 3:
-                header_size = int.from_bytes(data[6:8], 'little')
-                palette = data[14:header_size]
-                pixels = data[header_size:]
-                depth = data[12]
-                rle = data[13] == 1
-                liste_pixels = decode_pixels_v3(palette, pixels, liste_pixels, pixels_expected, depth, rle)
-            elif version == 4:
-                liste_pixels = decode_pixels_v4(bytes_pixels, liste_pixels)
-            image = Image(largeur, hauteur, liste_pixels)
-            return image
-
-
-def decode_pixels_v1(bytes_pixels: bytes, liste_pixels: list):
-    """
-    Decodage de la version 1 du format ULBMP, parcourt la suite de bytes associés aux pixels 3 par 3, associe le
-    premier, deuxieme et troisieme byte aux intensités des canaux rouge, vert et bleu respectivement, ajoute dans la
-    liste donnée en parametre un Pixel composé des valeurs RGB. Return la liste
-    """
-    for i in range(0, len(bytes_pixels), 3):
-        temp_pixel = bytes_pixels[i:i + 3]
-        red, blue, green = temp_pixel[0], temp_pixel[1], temp_pixel[2]
-        liste_pixels.append(Pixel(red, blue, green))
-    return liste_pixels
-
-
-def decode_pixels_v2(bytes_pixels: bytes, liste_pixels: list):
-    """
-    Decodage de la version 2 du format ULBMP, parcourt la suite de bytes associés aux pixels 4 par 4, associe le
-    premier byte au nombre de fois qu'il faut multiplier le pixel, et le deuxieme, troisieme et quatrieme byte aux
-    intensités des canaux rouge, vert et bleu respectivement, ajoute dans la liste donnée en parametre un Pixel composé
-    des valeurs RGB multiplié par le nombre du premier byte. Return la liste
-    """
-    for i in range(0, len(bytes_pixels), 4):
-        temp_pixel = bytes_pixels[i:i + 4]
-        red, blue, green = temp_pixel[1], temp_pixel[2], temp_pixel[3]
-        liste_pixels += temp_pixel[0] * [Pixel(red, blue, green)]
-    return liste_pixels
-
-
-def decode_pixels_v3(palette: bytes, bytes_pixels: bytes, liste_pixels: list, pixels_expected: int, depth: int,
-                     rle=False):
-    """
-    Decodage de la version 3 du format ULBMP, prend en parametre les suites de bytes composant la palette et les pixels,
-    une liste vide, le nombre de pixels attendus, la profondeur et le RLE (sur False par defaut), utilise le decodage de
-    la version 1 pour obtenir une palette sous forme de liste, dans le cas d'une profondeur 24, utilise le decodage de
-    la version 1 si le RLE n'est pas activé, et le decodage de la version 2 s'il l'est, dans le cas d'une profondeur de
-    8, si le RLE n'est pas activé, parcourt la suite bytes qui composent les indices referencant la palette, et ajoute
-    dans la liste de pixels le pixel correspondant à l'indice dans la palette sous forme de liste construite plus tot,
-    si le RLE est activé, parcourt la suite de bytes 2 par 2, effectue le meme traitement pour le deuxieme byte, mais
-    multiplié par le nombre donné dans le premier byte, pour les profondeurs ≤ 4, appelle la fonction palette_from_bits
-    pour construire la liste de pixels, return la liste de pixels.
-    """
-    liste_palette = []
-    liste_palette = decode_pixels_v1(palette, liste_palette)
-    if depth == 24:
-        if not rle:
-            liste_pixels = decode_pixels_v1(bytes_pixels, liste_pixels)
-        elif rle:
-            liste_pixels = decode_pixels_v2(bytes_pixels, liste_pixels)
-    if depth == 8:
-        if not rle:
-            for indice_palette in bytes_pixels:
-                pixel_to_add = liste_palette[indice_palette]
-                liste_pixels.append(pixel_to_add)
-        elif rle:
-            for i in range(0, len(bytes_pixels), 2):
-                temp_pixel = bytes_pixels[i:i + 2]
-                number_of_pixels, indice_palette = temp_pixel[0], temp_pixel[1]
-                pixel_to_add = liste_palette[indice_palette]
-                liste_pixels += number_of_pixels * [pixel_to_add]
-    elif depth in (1, 2, 4):
-        liste_pixels = decode_depth_under_8(bytes_pixels, depth, liste_pixels, liste_palette, pixels_expected)
-    return liste_pixels
-
-
-def decode_depth_under_8(bytes_pixels, depth, liste_pixels, liste_palette, pixels_expected):
-    """
-    Fonction appelée lors du decodage de la version 3 lorsque la profondeur ≤ 4, prend en parametre la suite de byte
-    representant les pixels, la profondeur, une liste de vide dans laquelle ajouter les pixels, la liste representant
-    la palette, et le nombre de pixels attendus, parcourt la suite de bytes byte par byte, pour chaque byte,
-    initialise une liste d'indices vides, verifie s'il reste des pixels à encoder dans l'image de sorte à ne pas
-    encoder les bits de padding, si tel est le cas, isole l'indice en fonction de la profondeur et ajoute l'indice
-    dans la liste. Parcourt les indices dans la liste 'indices_palette' pour ajouter les pixels associés dans
-    'liste_pixels', retourne la liste de pixels.
-    """
-    nombre_pixels = 0
-    for byte in bytes_pixels:
-        indices_palette = []
-        for i in range(8 - depth, -1, -depth):
-            nombre_pixels += 1
-            if nombre_pixels <= pixels_expected:
-                indice = (byte >> i) & ((2 ** depth) - 1)
-                indices_palette.append(indice)
-        for indice in indices_palette:
-            liste_pixels += [liste_palette[indice]]
-    return liste_pixels
-
-
-def decode_pixels_v4(bytes_pixels: bytes, liste_pixels: list):
-    """
-    Decodage de la version 4 du format ULBMP, initialise un pixel noir comme pixel precedent pour les comparaisons,
-    identifie le bloc à decoder selon les premiers bits de la suite de bytes, ajoute le pixel representé par le bloc
-    et incremente i de sorte à parcourir la suite de bytes blocs par blocs. Retourne la liste de pixels.
-    """
-    i = 0
-    pixel_prec = Pixel(0, 0, 0)
-    while i < len(bytes_pixels):
-        byte0 = bytes_pixels[i]
-        if byte0 == 255:  # ULBMP_NEW_PIXEL
-            r, g, b = bytes_pixels[i + 1], bytes_pixels[i + 2], bytes_pixels[i + 3]
-            pixel_prec = Pixel(r, g, b)
-            liste_pixels.append(pixel_prec)
-            i += 4
-        elif byte0 >> 6 == 0:  # ULBMP_SMALL_DIFF
-            delta_r = ((byte0 >> 4) & 0b11) - 2
-            delta_g = ((byte0 >> 2) & 0b11) - 2
-            delta_b = (byte0 & 0b11) - 2
-            liste_pixels, bytes_pixels, pixel_prec, i = decode_blocs(delta_r, delta_g, delta_b, pixel_prec,
-                                                                     liste_pixels, bytes_pixels, i, 1)
-        elif byte0 >> 6 == 1:  # ULBMP_INTERMEDIATE_DIFF
-            delta_g = (byte0 & 0b111111) - 32
-            delta_rg = (bytes_pixels[i + 1] >> 4) - 8
-            delta_bg = (bytes_pixels[i + 1] & 0b1111) - 8
-            delta_r, delta_b = delta_rg + delta_g, delta_bg + delta_g
-            liste_pixels, bytes_pixels, pixel_prec, i = decode_blocs(delta_r, delta_g, delta_b, pixel_prec,
-                                                                     liste_pixels, bytes_pixels, i, 2)
-        elif byte0 >> 4 == 8:  # ULBMP_BIG_DIFF_R
-            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
-            delta_r = compose_byte(byte0, byte1, 4, 4) - 128
-            delta_gr = compose_byte(byte1, byte2, 2, 6) - 32
-            delta_br = (byte2 & 0b111111) - 32
-            delta_g, delta_b = delta_gr + delta_r, delta_br + delta_r
-            liste_pixels, bytes_pixels, pixel_prec, i = decode_blocs(delta_r, delta_g, delta_b, pixel_prec,
-                                                                     liste_pixels, bytes_pixels, i, 3)
-        elif byte0 >> 4 == 9:  # ULBMP_BIG_DIFF_G
-            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
-            delta_g = compose_byte(byte0, byte1, 4, 4) - 128
-            delta_rg = compose_byte(byte1, byte2, 2, 6) - 32
-            delta_bg = (byte2 & 0b111111) - 32
-            delta_r, delta_b = delta_rg + delta_g, delta_bg + delta_g
-            liste_pixels, bytes_pixels, pixel_prec, i = decode_blocs(delta_r, delta_g, delta_b, pixel_prec,
-                                                                     liste_pixels, bytes_pixels, i, 3)
-        elif byte0 >> 4 == 10:  # ULBMP_BIG_DIFF_B
-            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
-            delta_b = compose_byte(byte0, byte1, 4, 4) - 128
-            delta_rb = compose_byte(byte1, byte2, 2, 6) - 32
-            delta_gb = (byte2 & 0b111111) - 32
-            delta_r, delta_g = delta_rb + delta_b, delta_gb + delta_b
-            liste_pixels, bytes_pixels, pixel_prec, i = decode_blocs(delta_r, delta_g, delta_b, pixel_prec,
-                                                                     liste_pixels, bytes_pixels, i, 3)
-    return liste_pixels
-
-
-def decode_blocs(delta_r, delta_g, delta_b, pixel_prec, liste_pixels, bytes_list, i, increment):
-    """
-    Fonction generalisant le processus de decodage pour les blocs autre que NEW_PIXEL, est appelée lorsque les delta_r,
-    delta_g et delta_b sont definis, prend en parametre les deltas, le pixel precedent, la liste de pixels en
-    construction, la suite de bytes, l'indice actuel de la suite de bytes, et increment à ajouter à cet indice pour
-    passer au bloc suivant.
-    """
-    r, g, b = delta_r + pixel_prec.get_red(), delta_g + pixel_prec.get_green(), delta_b + pixel_prec.get_blue()
-    pixel_prec = Pixel(r, g, b)
-    liste_pixels.append(pixel_prec)
-    i += increment  # supprime le bloc traité de la liste de bytes pour passer au prochain
-    return liste_pixels, bytes_list, pixel_prec, i
-
-
-def compose_byte(byte0, byte1, lsb, msb):
-    """
-    Fonction appelée lorsque qu'on veut restituer un entier dont les bits sont repartis sur plusieurs bytes,
-    prend en parametre les deux bytes sur lequel est reparti le byte qu'on veut reconstituer, lsb (least significant
-    bit) determine le nombre de bits de poids faible qu'il faut ajouter au byte1 pour 'inserer' la partie 'gauche' du
-    byte qu'on veut reconstituer, quant à msb, il détermine le nombre de bits de poids faibles qu'il faut 'enlever' au
-    byte2, 'assemble' les deux parties avec l'opérateur '|' (ou).
-    """
-    lsb_byte1 = byte0 & 0b00001111  # garde uniquement les 4 bits de poids faible du premier byte : 0b10110110 → 0b1011
-    left_part = lsb_byte1 << lsb  # ajoute lsb bits de poids faibles pour placer la deuxieme partie : 0b1011 → 0b101100
-    msb_byte2 = byte1 >> msb  # garde uniquement les msb bits de poids forts du second byte : 0b1011100 → 0b10
-    return left_part | msb_byte2  # reconstitue le byte : 0b101100 | 0b10 → 0b101110
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+"""
+
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+from bisect import bisect_right
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import accumulate, compress, islice
+from operator import mul, ne, sub
+from typing import NamedTuple
+
+import backend
+from colorstats import couleurs_uniques
+from image import Image, buffer_rgb, entiers_rgb
+from instrumentation import phase
+from pixel import Pixel
+from palette import PROFONDEURS, Palette
+
+TAILLE_CHUNK = 1 << 16
+SIGNATURE_INDEX = b'ULIDX\x02'
+TAILLE_EMPREINTE_INDEX = 1 << 12
+
+
+class Encoder:
+    def __init__(self, img: Image, version_format=1, **kwargs):
+        self.image = img
+        self.largeur = img.get_width()
+        self.hauteur = img.get_height()
+        self.version = version_format
+        if self.version == 3 and ('rle' not in kwargs or 'depth' not in kwargs):
+            raise ValueError
+        if self.version == 3 and kwargs['depth'] not in PROFONDEURS + ('auto',):
+            raise ValueError(f"Unsupported depth {kwargs['depth']}")
+        self.profondeur = kwargs.get('depth')
+        self.rle = kwargs.get('rle')
+        self.workers = kwargs.get('workers', 1)
+        self.index = kwargs.get('index')
+        self.stats = kwargs.get('stats')
+        self.incremental = kwargs.get('incremental')
+        self.cache_bandes = None
+        self.bandes_reencodees = None
+        self.nombre_pixels = self.largeur * self.hauteur
+
+    def save_to(self, path: str) -> None:
+        """
+        Compose le header en bytes à partir des donnees de l'image, puis appelle differentes fonctions pour composer la
+        suite de bytes representant les pixels en fonction de la version, et seulement ensuite ouvre le fichier donné
+        par le path en parametre pour y écrire le header et les bytes representant les pixels, de sorte qu'une erreur
+        d'encodage (palette trop grande par exemple) ne laisse pas de fichier tronqué. Avec workers > 1, les pixels
+        sont encodés par bandes dans plusieurs processus (voir parallel.encode_parallele). Avec index=K, un index des
+        lignes (une entrée toutes les K lignes) est écrit à coté du fichier pour les encodages de taille variable
+        (voir ecrire_index), un ancien index du meme fichier est supprimé sinon. Avec stats=Statistiques(), la durée
+        de chaque phase et les compteurs des blocs produits sont ajoutés aux statistiques (voir instrumentation.py).
+        Avec incremental=K (versions 2, 3 et 4), les pixels sont encodés par bandes d'environ K lignes gardées dans
+        l'Encoder, et un save_to suivant ne reencode que les bandes modifiées depuis (voir incremental.py).
+        """
+        header, pixels_to_encode, profondeur = self.encode()
+        self.ecrire(path, header, pixels_to_encode, profondeur)
+
+    def encode(self):
+        """
+        Encode l'image sans rien écrire (premiere partie de save_to). Return le header, les pixels à encoder et la
+        profondeur utilisée (None hors version 3).
+        """
+        stats = self.stats
+        palette, profondeur = None, None
+        if self.version == 3:
+            with phase(stats, 'palette'):
+                palette, profondeur = self.get_palette()
+        with phase(stats, 'pixels'):
+            if self.incremental and self.version in (2, 3, 4):
+                from incremental import encode_incremental
+                pixels_to_encode = encode_incremental(self, palette, profondeur)
+            elif self.workers > 1 and self.version in (2, 3, 4):
+                from parallel import encode_parallele
+                pixels_to_encode = encode_parallele(self, palette, profondeur)
+            elif self.version == 1:
+                pixels_to_encode = self.encode_pixels_v1()
+            elif self.version == 2:
+                pixels_to_encode = self.encode_pixels_v2()
+            elif self.version == 3:
+                pixels_to_encode = self.encode_pixels_v3(palette, profondeur)
+            elif self.version == 4:
+                pixels_to_encode = self.encode_pixels_v4()
+            elif self.version == 5:
+                pixels_to_encode = self.encode_pixels_v5()
+        with phase(stats, 'header'):
+            header = self.compose_header(palette, profondeur)
+        return header, pixels_to_encode, profondeur
+
+    def ecrire(self, path: str, header, pixels_to_encode, profondeur) -> None:
+        """
+        Ecrit le header et les pixels encodés par encode dans le fichier, puis l'index des lignes et les statistiques
+        (seconde partie de save_to).
+        """
+        stats = self.stats
+        with phase(stats, 'ecriture'):
+            with open(path, 'wb') as file:
+                file.write(header)
+                file.write(pixels_to_encode)
+            supprimer_index(path)
+            if self.index:
+                entrees = index_lignes(self.version, self.rle_actif(profondeur), profondeur, pixels_to_encode,
+                                       self.image.get_buffer(), self.largeur, self.hauteur, self.index)
+                if entrees is not None:
+                    ecrire_index(path, self.index, entrees)
+        if stats is not None:
+            stats.analyser(self.version, profondeur, self.rle_actif(profondeur), pixels_to_encode, len(header))
+            stats.terminer()
+
+    async def asave(self, path: str, executor=None, limite=None) -> None:
+        """
+        Version asynchrone de save_to pour une boucle asyncio : l'encodage est executé dans 'executor' (un
+        ThreadPoolExecutor ou un ProcessPoolExecutor, le pool de threads par defaut de la boucle sinon) et l'écriture
+        dans un thread, la boucle n'est donc jamais bloquée. 'limite', un asyncio.Semaphore partagé entre les appels,
+        borne le nombre d'encodages en cours. Une tache annulée avant l'écriture ne laisse aucun fichier (un encodage
+        deja commencé dans l'executor se termine mais son resultat est ignoré), une écriture commencée va jusqu'au
+        bout. Avec un ProcessPoolExecutor, l'Encoder est copié dans le processus fils (il doit etre picklable) : la
+        durée des phases d'encodage et l'etat de l'encodage incremental ne reviennent pas dans ce processus.
+        """
+        async with limite or nullcontext():
+            boucle = asyncio.get_running_loop()
+            header, pixels_to_encode, profondeur = await boucle.run_in_executor(executor, encoder_detache, self)
+            await asyncio.to_thread(self.ecrire, path, header, pixels_to_encode, profondeur)
+
+    def compose_header(self, palette=None, profondeur=None):
+        """
+        Return le header en bytes de l'image à encoder (voir compose_header).
+        """
+        return compose_header(self.version, self.largeur, self.hauteur, palette, profondeur, self.rle_actif(profondeur))
+
+    def rle_actif(self, profondeur):
+        """
+        Le RLE de la version 3 n'existe qu'en profondeur 8 et 24, il est ignoré pour les profondeurs inferieures.
+        """
+        return bool(self.rle) and profondeur in (8, 24)
+
+    def encode_pixels_v1(self):
+        """
+        Encodage de la version 1 du format ULBMP, l'intensité des canaux RGB est encodée sur un byte chacun, ce qui
+        correspond exactement au buffer de l'image : return une memoryview sur ce buffer, sans copie.
+        """
+        return memoryview(self.image.get_buffer())
+
+    def encode_pixels_v2(self):
+        """
+        Encodage de la version 2 du format ULBMP, detecte les runs de pixels identiques sur l'ensemble du buffer
+        (voir detecter_runs), les decoupe en blocs d'au plus 255 pixels, puis remplit un bytearray préalloué de 4 bytes
+        par bloc : l'occurence dans le premier byte et l'intensité des canaux RGB du pixel répeté dans les trois
+        suivants (voir ecrire_blocs_runs). Return les bytes associés aux pixels.
+        """
+        buffer = self.image.get_buffer()
+        runs = EncodeurRuns(3)
+        return runs.encoder(entiers_rgb(buffer), buffer) + runs.vider()
+
+    def encode_pixels_v3(self, palette, profondeur):
+        """
+        Encodage de la version 3 du format ULBMP, prend en parametre la palette (None en profondeur 24) et la
+        profondeur. Dans le cas d'une profondeur 24, utilise l'encodage de la version 1 si le RLE n'est pas activé, et
+        l'encodage de la version 2 s'il l'est. Sinon, convertit une seule fois tous les pixels en indices de palette
+        (un byte par pixel, voir Palette.indices_from_buffer) : en profondeur 8 sans RLE ces indices sont la suite de
+        bytes à encoder, avec RLE les runs d'indices sont detectés comme pour la version 2 et encodés sur 2 bytes
+        (occurence puis indice), pour les profondeurs 1, 2 et 4 les indices sont regroupés par 8 // profondeur dans
+        chaque byte. Return les pixels à encoder.
+        """
+        if profondeur == 24:
+            return self.encode_pixels_v2() if self.rle_actif(profondeur) else self.encode_pixels_v1()
+        indices = palette.indices_from_buffer(self.image.get_buffer())
+        if profondeur == 8 and self.rle_actif(profondeur):
+            runs = EncodeurRuns(1)
+            return runs.encoder(indices, indices) + runs.vider()
+        if profondeur == 8:
+            return indices
+        return empaqueter_indices(indices, profondeur)
+
+    def encode_pixels_v4(self):
+        """
+        Encodage de la version 4 du format ULBMP, en partant d'un pixel noir comme pixel precedent (voir
+        encode_rgb_v4). Return les pixels à encoder.
+        """
+        return encode_rgb_v4(self.image.get_buffer())
+
+    def encode_pixels_v5(self):
+        """
+        Encodage de la version 5 du format ULBMP (voir encode_rgb_v5). Return les pixels à encoder.
+        """
+        return encode_rgb_v5(self.image.get_buffer())
+
+    def get_palette(self):
+        """
+        Construit la palette des couleurs uniques de l'image (sauf en profondeur 24 où il n'y en a pas) et determine la
+        profondeur à utiliser : la plus petite profondeur suffisante si la profondeur demandée est 'auto', sinon la
+        profondeur demandée, en levant une ValueError si la palette ne tient pas dans cette profondeur. Le comptage des
+        couleurs s'arrete dès que la profondeur (ou 256 couleurs en 'auto') est depassée. Return la palette et la
+        profondeur.
+        """
+        if self.profondeur == 24:
+            return None, 24
+        limite = 256 if self.profondeur == 'auto' else 2 ** self.profondeur
+        couleurs = couleurs_uniques(self.image.get_buffer(), limite)
+        if len(couleurs) > limite:
+            if self.profondeur == 'auto':
+                return None, 24
+            raise ValueError(f'More than {limite} colours, the palette does not fit in depth {self.profondeur}')
+        palette = Palette(couleurs)
+        return palette, palette.profondeur_minimale() if self.profondeur == 'auto' else self.profondeur
+
+    @staticmethod
+    def auto(img: Image, goal='size', **kwargs):
+        """
+        Choisit la variante du format pour l'image sans encoder les autres : les statistiques de l'image (couleurs
+        uniques, runs, echantillon des blocs de la version 4) donnent une estimation de la taille et du coût
+        d'encodage de chaque variante (voir estimation.py), la plus petite (goal='size') ou la plus rapide
+        (goal='speed') est retenue. Les autres parametres (workers, index) sont passés à l'Encoder. Return l'Encoder de
+        la variante choisie, dont 'estimations' contient toutes les estimations et 'estimation' celle retenue, pour
+        pouvoir les comparer au fichier produit.
+        """
+        from estimation import choisir_variante, estimer_variantes, statistiques
+        estimations = estimer_variantes(statistiques(img))
+        choix = choisir_variante(estimations, goal)
+        encoder = Encoder(img, choix['version'], **choix['options'], **kwargs)
+        encoder.estimations = estimations
+        encoder.estimation = choix
+        return encoder
+
+    @staticmethod
+    def save_rows(path: str, largeur: int, hauteur: int, lignes, version_format=1, **kwargs) -> None:
+        """
+        Encode une image ligne par ligne sans jamais la construire en entier : 'lignes' est un iterable de lignes
+        (3 * largeur bytes RGB chacune) ou une fonction qui prend le numero de la ligne et la renvoie. Les parametres
+        sont ceux du constructeur, avec en plus 'palette' pour la version 3 en profondeur ≤ 8 (voir EncodeurFlux).
+        """
+        if callable(lignes):
+            lignes = map(lignes, range(hauteur))
+        with EncodeurFlux(path, largeur, hauteur, version_format, **kwargs) as flux:
+            for ligne in lignes:
+                flux.write_row(ligne)
+
+
+class EncodeurFlux:
+    def __init__(self, path: str, largeur: int, hauteur: int, version_format=1, **kwargs):
+        """
+        Encodage incremental d'une image dont les lignes arrivent une par une. Le header est écrit dès l'ouverture
+        (la palette de la version 3 doit donc etre donnée d'avance avec le parametre 'palette', sous forme de Palette
+        ou de liste de couleurs), puis chaque ligne est encodée et écrite dans un fichier bufferisé. L'etat qui
+        traverse les lignes est gardé dans l'encodeur : le run en attente des versions 2 et 3 avec RLE, le pixel
+        precedent de la version 4 et les indices qui ne remplissent pas encore un byte en profondeur < 8.
+        """
+        if version_format == 3 and ('rle' not in kwargs or 'depth' not in kwargs):
+            raise ValueError
+        if version_format == 5:
+            raise ValueError('Streaming encoding does not support version 5')
+        self.largeur = largeur
+        self.hauteur = hauteur
+        self.version = version_format
+        self.profondeur = kwargs.get('depth')
+        self.palette = None
+        if self.version == 3 and self.profondeur != 24:
+            if kwargs.get('palette') is None:
+                raise ValueError('Streaming a palette-based image requires the palette')
+            palette = kwargs['palette']
+            self.palette = palette if isinstance(palette, Palette) else Palette.from_couleurs(palette)
+            if self.profondeur == 'auto':
+                self.profondeur = self.palette.profondeur_minimale()
+            self.palette.verifier_profondeur(self.profondeur)
+            if self.profondeur == 24:
+                self.palette = None
+        self.rle = self.version == 3 and bool(kwargs.get('rle')) and self.profondeur in (8, 24)
+        self.version_pixels = self.version
+        if self.version == 3 and self.profondeur == 24:
+            self.version_pixels = 2 if self.rle else 1
+        self.runs = EncodeurRuns(1 if self.palette is not None else 3)
+        self.pixel_prec = (0, 0, 0)
+        self.indices_en_attente = b''
+        self.lignes_ecrites = 0
+        supprimer_index(path)
+        self.file = open(path, 'wb', buffering=TAILLE_CHUNK)
+        self.file.write(compose_header(self.version, largeur, hauteur, self.palette, self.profondeur, self.rle))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write_row(self, ligne) -> None:
+        """
+        Encode une ligne de l'image et écrit les bytes obtenus.
+        """
+        if len(ligne) != self.largeur * 3:
+            raise ValueError(f'Row of {len(ligne)} bytes, expected {self.largeur * 3}')
+        if self.lignes_ecrites == self.hauteur:
+            raise ValueError('More rows than the image height')
+        self.file.write(self.encoder_ligne(ligne))
+        self.lignes_ecrites += 1
+
+    def encoder_ligne(self, ligne):
+        """
+        Return les bytes d'une ligne selon la version, en mettant à jour l'etat gardé entre les lignes.
+        """
+        if self.version_pixels == 1:
+            return ligne
+        if self.version_pixels == 2:
+            return self.runs.encoder(entiers_rgb(ligne), ligne)
+        if self.version_pixels == 4:
+            pixels_to_encode = encode_rgb_v4(ligne, self.pixel_prec)
+            if ligne:
+                self.pixel_prec = tuple(ligne[-3:])
+            return pixels_to_encode
+        indices = self.palette.indices_from_buffer(ligne)
+        if self.rle:
+            return self.runs.encoder(indices, indices)
+        if self.profondeur == 8:
+            return indices
+        indices = self.indices_en_attente + indices
+        complets = len(indices) - len(indices) % (8 // self.profondeur)
+        self.indices_en_attente = indices[complets:]
+        return empaqueter_indices(indices[:complets], self.profondeur)
+
+    def close(self) -> None:
+        """
+        Termine l'encodage : encode le run en attente ou le dernier byte incomplet, puis ferme le fichier. Leve une
+        ValueError si toutes les lignes de l'image n'ont pas été écrites.
+        """
+        try:
+            self.file.write(self.runs.vider())
+            if self.indices_en_attente:
+                self.file.write(empaqueter_indices(self.indices_en_attente, self.profondeur))
+                self.indices_en_attente = b''
+            if self.lignes_ecrites != self.hauteur:
+                raise ValueError(f'{self.lignes_ecrites} rows written, expected {self.hauteur}')
+        finally:
+            self.file.close()
+
+
+def compose_header(version, largeur, hauteur, palette=None, profondeur=None, rle=False):
+    """
+    Return le header en bytes : signature, version, taille du header, largeur et hauteur, suivis pour la version 3
+    de la profondeur, du byte RLE et de la palette binaire (absente en profondeur 24).
+    """
+    ulbmp_ascii = b'ULBMP'
+    bytes_version = version.to_bytes(1)
+    bytes_largeur = largeur.to_bytes(2, 'little')
+    bytes_hauteur = hauteur.to_bytes(2, 'little')
+    if version != 3:
+        return ulbmp_ascii + bytes_version + (12).to_bytes(2, 'little') + bytes_largeur + bytes_hauteur
+    binary_palette = palette.to_bytes() if palette is not None else b''
+    bytes_header = (14 + len(binary_palette)).to_bytes(2, 'little')
+    return (ulbmp_ascii + bytes_version + bytes_header + bytes_largeur + bytes_hauteur + profondeur.to_bytes(1)
+            + (b'\x01' if rle else b'\x00') + binary_palette)
+
+
+def encode_rgb_v4(buffer, pixel_prec=(0, 0, 0)):
+    """
+    Encodage de la version 4 du format ULBMP d'un buffer RGB, part du pixel precedent donné (noir par defaut).
+    Les deltas de tous les pixels sont calculés en une fois canal par canal (soustraction du canal decalé d'un pixel),
+    puis chaque triplet de deltas est classé : un dictionnaire precalculé donne directement le byte des blocs
+    SMALL_DIFF, sinon les bornes des blocs INTERMEDIATE_DIFF puis BIG_DIFF R, G et B sont testées dans cet ordre, et
+    le pixel est encodé en NEW_PIXEL si aucun bloc ne convient. Les bytes sont ajoutés à un bytearray.
+    Return les pixels à encoder. Implementation de reference, remplacée par celle du backend NumPy s'il est actif
+    (voir backend.py).
+    """
+    rapide = backend.accelere()
+    if rapide is not None:
+        return rapide.encode_rgb_v4(buffer, pixel_prec)
+    reds, greens, blues = buffer[0::3], buffer[1::3], buffer[2::3]
+    red_prec, green_prec, blue_prec = pixel_prec
+    deltas = zip(map(sub, reds, bytes((red_prec,)) + reds[:-1]),
+                 map(sub, greens, bytes((green_prec,)) + greens[:-1]),
+                 map(sub, blues, bytes((blue_prec,)) + blues[:-1]))
+    bytes_small = BYTES_SMALL_V4
+    pixels_to_encode = bytearray()
+    append, extend = pixels_to_encode.append, pixels_to_encode.extend
+    for delta, red, green, blue in zip(deltas, reds, greens, blues):
+        byte0 = bytes_small.get(delta)
+        if byte0 is not None:  # ULBMP_SMALL_DIFF
+            append(byte0)
+            continue
+        delta_r, delta_g, delta_b = delta
+        delta_rg, delta_bg = delta_r - delta_g, delta_b - delta_g
+        if -32 <= delta_g <= 31 and -8 <= delta_rg <= 7 and -8 <= delta_bg <= 7:  # ULBMP_INTERMEDIATE_DIFF
+            extend((64 | (delta_g + 32), ((delta_rg + 8) << 4) | (delta_bg + 8)))
+            continue
+        if -128 <= delta_r <= 127 and -32 <= -delta_rg <= 31 and -32 <= delta_b - delta_r <= 31:
+            signature, delta1, delta2, delta3 = 128, delta_r, -delta_rg, delta_b - delta_r  # ULBMP_BIG_DIFF_R
+        elif -128 <= delta_g <= 127 and -32 <= delta_rg <= 31 and -32 <= delta_bg <= 31:
+            signature, delta1, delta2, delta3 = 144, delta_g, delta_rg, delta_bg  # ULBMP_BIG_DIFF_G
+        elif -128 <= delta_b <= 127 and -32 <= delta_r - delta_b <= 31 and -32 <= -delta_bg <= 31:
+            signature, delta1, delta2, delta3 = 160, delta_b, delta_r - delta_b, -delta_bg  # ULBMP_BIG_DIFF_B
+        else:  # ULBMP_NEW_PIXEL
+            extend((255, red, green, blue))
+            continue
+        delta1, delta2 = delta1 + 128, delta2 + 32
+        extend((signature | (delta1 >> 4), ((delta1 & 0b1111) << 4) | (delta2 >> 2),
+                ((delta2 & 0b11) << 6) | (delta3 + 32)))
+    return pixels_to_encode
+
+
+def encode_rgb_v5(buffer, pixel_prec=(0, 0, 0)):
+    """
+    Encodage de la version 5 du format ULBMP d'un buffer RGB, qui reprend les blocs de la version 4 et ajoute :
+        - RUN_SHORT (0xE0 à 0xFE, 1 byte) : le pixel precedent répeté 1 à 31 fois (byte - 0xDF),
+        - RUN_LONG (0xB0 à 0xBF + 1 byte) : le pixel precedent répeté 32 à 4127 fois (32 + les 12 bits de poids
+          faible des deux bytes),
+        - INDEX (0xC0 à 0xDF, 1 byte) : la couleur de la case (byte & 0b11111) de la table des couleurs récentes.
+    La table a 32 cases, toutes noires au depart, la couleur (R, G, B) est rangée dans la case
+    (3 * R + 5 * G + 7 * B) % 32 chaque fois qu'elle est encodée par un bloc de deltas ou NEW_PIXEL. Les runs sont
+    detectés sur l'ensemble du buffer (voir detecter_runs) et les blocs de la version 4 du premier pixel de chaque run
+    sont calculés en une fois par encode_rgb_v4 sur la suite de ces pixels (le pixel precedent du premier pixel d'un
+    run est le pixel du run precedent). Chaque run est ensuite encodé par un bloc INDEX si la table contient deja sa
+    couleur, par son bloc de la version 4 sinon, suivi de blocs RUN pour les pixels restants. Return les pixels à
+    encoder.
+    """
+    entiers = entiers_rgb(buffer)
+    debuts, longueurs = detecter_runs(entiers)
+    couleurs = list(map(entiers.__getitem__, debuts))
+    blocs = encode_rgb_v4(buffer_rgb(couleurs), pixel_prec)
+    longueurs_v4 = LONGUEURS_V4
+    table = [0] * 32
+    couleur_prec = int.from_bytes(bytes(pixel_prec))
+    pixels_to_encode = bytearray()
+    append, extend = pixels_to_encode.append, pixels_to_encode.extend
+    i = 0
+    for couleur, longueur in zip(couleurs, longueurs):
+        fin = i + longueurs_v4[blocs[i]]
+        if couleur != couleur_prec:
+            longueur -= 1
+            case = (3 * (couleur >> 16) + 5 * ((couleur >> 8) & 0xFF) + 7 * (couleur & 0xFF)) & 31
+            if table[case] == couleur:  # ULBMP_INDEX
+                append(0xC0 | case)
+            else:
+                table[case] = couleur
+                extend(blocs[i:fin])
+            couleur_prec = couleur
+        i = fin
+        while longueur >= 32:  # ULBMP_RUN_LONG
+            run = min(longueur, 4127) - 32
+            extend((0xB0 | (run >> 8), run & 0xFF))
+            longueur -= run + 32
+        if longueur:  # ULBMP_RUN_SHORT
+            append(0xDF + longueur)
+    return pixels_to_encode
+
+
+def detecter_runs(valeurs):
+    """
+    Detection des runs d'une suite de valeurs (entiers RGB ou indices de palette) sans boucle Python par pixel :
+    compare la suite avec elle-meme decalée d'un cran pour obtenir les positions où la valeur change, ce qui donne le
+    debut de chaque run, et en deduit les longueurs. Return la liste des debuts et la liste des longueurs.
+    """
+    nombre_valeurs = len(valeurs)
+    if nombre_valeurs == 0:
+        return [], []
+    debuts = [0]
+    debuts += compress(range(1, nombre_valeurs), map(ne, valeurs[1:], valeurs[:-1]))
+    longueurs = list(map(sub, debuts[1:] + [nombre_valeurs], debuts))
+    return debuts, longueurs
+
+
+def decouper_runs(debuts, longueurs):
+    """
+    Decoupe les runs trop longs pour tenir sur un byte. Comme l'encodeur d'origine, un run de L pixels donne
+    L // 255 blocs de 255 suivis d'un bloc de L % 255 pixels (eventuellement 0), ce qui garde la sortie identique
+    aux fichiers existants. Return les debuts et longueurs des blocs.
+    """
+    if not longueurs or max(longueurs) < 255:
+        return debuts, longueurs
+    blocs_debuts, blocs_longueurs = [], []
+    for debut, longueur in zip(debuts, longueurs):
+        nombre_blocs_pleins = longueur // 255
+        blocs_debuts += [debut] * (nombre_blocs_pleins + 1)
+        blocs_longueurs += [255] * nombre_blocs_pleins
+        blocs_longueurs.append(longueur % 255)
+    return blocs_debuts, blocs_longueurs
+
+
+def ecrire_blocs_runs(debuts, longueurs, valeurs, taille_valeur):
+    """
+    Encode des runs en blocs de 1 + taille_valeur bytes : l'occurence puis la valeur répetée, lue dans 'valeurs' à la
+    position du debut du run (canaux RGB pour la version 2, indice de palette pour la version 3 avec RLE). Les runs
+    sont d'abord decoupés en blocs d'au plus 255 pixels, puis un bytearray préalloué est rempli par tranches.
+    Return les bytes à encoder.
+    """
+    debuts, longueurs = decouper_runs(debuts, longueurs)
+    taille_bloc = taille_valeur + 1
+    pixels_to_encode = bytearray(taille_bloc * len(longueurs))
+    pixels_to_encode[0::taille_bloc] = bytes(longueurs)
+    for octet in range(taille_valeur):
+        pixels_to_encode[octet + 1::taille_bloc] = bytes(map(valeurs[octet::taille_valeur].__getitem__, debuts))
+    return pixels_to_encode
+
+
+class EncodeurRuns:
+    def __init__(self, taille_valeur: int):
+        """
+        Encodage RLE incremental utilisé par la version 2 et par la version 3 avec RLE : le dernier run d'un morceau
+        de pixels peut continuer dans le morceau suivant, il est donc gardé en attente (clé de comparaison, valeur
+        à encoder et longueur) et n'est encodé que lorsqu'un pixel different arrive ou à l'appel de vider().
+        """
+        self.taille_valeur = taille_valeur
+        self.cle = None
+        self.valeur = b''
+        self.longueur = 0
+
+    def encoder(self, cles, valeurs):
+        """
+        Prend en parametre les clés de comparaison des pixels (entiers RGB ou indices) et les valeurs à encoder
+        (taille_valeur bytes par pixel), return les bytes des runs terminés dans ce morceau.
+        """
+        debuts, longueurs = detecter_runs(cles)
+        if not longueurs:
+            return bytearray()
+        pixels_to_encode = bytearray()
+        if self.longueur and cles[0] == self.cle:
+            longueurs[0] += self.longueur
+        else:
+            pixels_to_encode += self.vider()
+        dernier = debuts[-1]
+        self.cle = cles[dernier]
+        self.valeur = bytes(valeurs[dernier * self.taille_valeur:(dernier + 1) * self.taille_valeur])
+        self.longueur = longueurs[-1]
+        pixels_to_encode += ecrire_blocs_runs(debuts[:-1], longueurs[:-1], valeurs, self.taille_valeur)
+        return pixels_to_encode
+
+    def vider(self):
+        """
+        Encode le run en attente, return ses bytes (vide s'il n'y en a pas).
+        """
+        if not self.longueur:
+            return b''
+        pixels_to_encode = ecrire_blocs_runs([0], [self.longueur], self.valeur, self.taille_valeur)
+        self.longueur = 0
+        return pixels_to_encode
+
+    def ajouter_run(self, cle, valeur, longueur):
+        """
+        Ajoute un run deja detecté (par exemple le premier ou le dernier run d'une bande encodée à part) : il prolonge
+        le run en attente s'il a la meme clé, sinon le run en attente est encodé et remplacé. Return les bytes encodés.
+        """
+        if self.longueur and cle == self.cle:
+            self.longueur += longueur
+            return b''
+        pixels_to_encode = self.vider()
+        self.cle, self.valeur, self.longueur = cle, valeur, longueur
+        return pixels_to_encode
+
+
+def segment_runs(cles, valeurs, taille_valeur):
+    """
+    Encode les runs d'une bande de pixels independamment du reste de l'image, en gardant à part le premier et le
+    dernier run qui peuvent se prolonger dans les bandes voisines. Return le premier run (clé, valeur, longueur), les
+    bytes des runs intermediaires et le dernier run (None si la bande ne contient qu'un run). Les bandes sont
+    ensuite recollées avec EncodeurRuns.ajouter_run.
+    """
+    debuts, longueurs = detecter_runs(cles)
+    runs = [(cles[debut], bytes(valeurs[debut * taille_valeur:(debut + 1) * taille_valeur]), longueur)
+            for debut, longueur in ((debuts[0], longueurs[0]), (debuts[-1], longueurs[-1]))]
+    if len(longueurs) == 1:
+        return runs[0], b'', None
+    return runs[0], ecrire_blocs_runs(debuts[1:-1], longueurs[1:-1], valeurs, taille_valeur), runs[1]
+
+
+def empaqueter_indices(indices, profondeur):
+    """
+    Regroupe les indices de palette (un byte par pixel) par 8 // profondeur dans chaque byte, le premier indice dans
+    les bits de poids fort. Le dernier byte est completé par des indices 0 si le nombre de pixels n'est pas un multiple
+    de 8 // profondeur. Sans boucle par pixel : la k-ieme colonne d'indices (indices[k::8 // profondeur]) est decalée
+    à sa place dans le byte par bytes.translate avec une table de decalage precalculée, puis les colonnes sont
+    combinées par un OU sur les grands entiers qu'elles representent. Return les bytes à encoder.
+    """
+    rapide = backend.accelere()
+    if rapide is not None:
+        return rapide.empaqueter_indices(indices, profondeur)
+    indices_par_byte = 8 // profondeur
+    indices = bytes(indices) + bytes(-len(indices) % indices_par_byte)
+    nombre_bytes = len(indices) // indices_par_byte
+    bits = 0
+    for colonne in range(indices_par_byte):
+        decalage = 8 - profondeur * (colonne + 1)
+        bits |= int.from_bytes(indices[colonne::indices_par_byte].translate(TABLES_DECALAGE[decalage]))
+    return bits.to_bytes(nombre_bytes)
+
+
+def index_lignes(version, rle, profondeur, bytes_pixels, buffer, largeur, hauteur, pas):
+    """
+    Calcule l'index des lignes d'un encodage de taille variable (version 2, version 3 avec RLE et version 4) à partir
+    des bytes des pixels et du buffer RGB de l'image : pour les lignes 0, pas, 2 * pas, ..., la position dans les bytes
+    des pixels du bloc qui contient le premier pixel de la ligne, le nombre de pixels de ce bloc qui appartiennent aux
+    lignes precedentes (reste d'un run) et le pixel precedent (version 4). Les runs sont retrouvés par la somme
+    cumulée de leurs occurences, les blocs de la version 4 en parcourant leurs premiers bytes (un pixel par bloc).
+    Return la liste des entrées (position, pixels ignorés, pixel precedent), None pour un encodage de taille fixe.
+    """
+    if version == 2 or (version == 3 and rle):
+        taille_bloc = 2 if version == 3 and profondeur == 8 else 4
+    elif version != 4:
+        return None
+    if largeur * hauteur == 0:
+        return []
+    entrees = []
+    if version == 4:
+        longueurs = LONGUEURS_V4
+        i = pixel = 0
+        for y in range(0, hauteur, pas):
+            debut_ligne = y * largeur
+            while pixel < debut_ligne:
+                i += longueurs[bytes_pixels[i]]
+                pixel += 1
+            pixel_prec = tuple(buffer[debut_ligne * 3 - 3:debut_ligne * 3]) if debut_ligne else (0, 0, 0)
+            entrees.append((i, 0, pixel_prec))
+        return entrees
+    occurences = bytes_pixels[0::taille_bloc]
+    fins = list(accumulate(occurences))
+    for y in range(0, hauteur, pas):
+        debut_ligne = y * largeur
+        bloc = bisect_right(fins, debut_ligne)
+        entrees.append((bloc * taille_bloc, debut_ligne - (fins[bloc] - occurences[bloc]), (0, 0, 0)))
+    return entrees
+
+
+class IndexLignes(NamedTuple):
+    """
+    Index des lignes d'un fichier ULBMP : une entrée (position dans les bytes des pixels, pixels ignorés, pixel
+    precedent) toutes les 'pas' lignes, l'entrée k concernant la ligne k * pas.
+    """
+    pas: int
+    entrees: list
+
+
+def chemin_index(path: str):
+    return path + '.idx'
+
+
+def empreinte_fichier(path: str, entrees):
+    """
+    Empreinte d'un fichier ULBMP pour verifier que son index des lignes lui correspond : BLAKE2b de 16 bytes de la
+    taille du fichier, de ses TAILLE_EMPREINTE_INDEX premiers bytes (header et premiers blocs), de ses
+    TAILLE_EMPREINTE_INDEX derniers bytes et des 16 bytes à la position de chaque entrée de l'index (les blocs où le
+    decodage reprend). Return la taille du fichier et l'empreinte.
+    """
+    with open(path, 'rb') as file:
+        taille_fichier = os.fstat(file.fileno()).st_size
+        empreinte = hashlib.blake2b(taille_fichier.to_bytes(8, 'little'), digest_size=16)
+        debut = file.read(TAILLE_EMPREINTE_INDEX)
+        empreinte.update(debut)
+        debut_pixels = int.from_bytes(debut[6:8], 'little')
+        for position, _, _ in entrees:
+            file.seek(debut_pixels + position)
+            empreinte.update(file.read(16))
+        file.seek(max(taille_fichier - TAILLE_EMPREINTE_INDEX, 0))
+        empreinte.update(file.read())
+    return taille_fichier, empreinte.digest()
+
+
+def ecrire_index(path: str, pas: int, entrees):
+    """
+    Ecrit l'index des lignes du fichier ULBMP deja écrit dans un fichier à coté (meme nom suivi de .idx), ce qui laisse
+    le fichier ULBMP identique et lisible par tous les decodeurs. Format : signature 'ULIDX' et version de l'index
+    (1 byte), pas (2 bytes), nombre d'entrées (4 bytes), taille du fichier ULBMP indexé (8 bytes), empreinte du fichier
+    (16 bytes, voir empreinte_fichier), puis 12 bytes par entrée : position (8 bytes), pixels ignorés (1 byte) et
+    canaux RGB du pixel precedent (3 bytes), entiers en little endian.
+    """
+    taille_fichier, empreinte = empreinte_fichier(path, entrees)
+    data = bytearray(SIGNATURE_INDEX + pas.to_bytes(2, 'little') + len(entrees).to_bytes(4, 'little')
+                     + taille_fichier.to_bytes(8, 'little') + empreinte)
+    for position, pixels_ignores, pixel_prec in entrees:
+        data += position.to_bytes(8, 'little') + pixels_ignores.to_bytes(1) + bytes(pixel_prec)
+    with open(chemin_index(path), 'wb') as file:
+        file.write(data)
+
+
+def lire_index(path: str):
+    """
+    Lit l'index des lignes du fichier ULBMP donné s'il existe. Return un IndexLignes, ou None si l'index est absent,
+    invalide, ou si la taille ou l'empreinte du fichier ne sont plus celles enregistrées (fichier réécrit depuis par
+    un autre programme, meme avec la meme taille).
+    """
+    try:
+        with open(chemin_index(path), 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    nombre_entrees = int.from_bytes(data[8:12], 'little')
+    if data[:6] != SIGNATURE_INDEX or len(data) != 36 + 12 * nombre_entrees:
+        return None
+    entrees = [(int.from_bytes(data[i:i + 8], 'little'), data[i + 8], tuple(data[i + 9:i + 12]))
+               for i in range(36, len(data), 12)]
+    try:
+        taille_fichier, empreinte = empreinte_fichier(path, entrees)
+    except OSError:
+        return None
+    if int.from_bytes(data[12:20], 'little') != taille_fichier or data[20:36] != empreinte:
+        return None
+    return IndexLignes(int.from_bytes(data[6:8], 'little'), entrees)
+
+
+def supprimer_index(path: str):
+    """
+    Supprime l'index des lignes d'un fichier qui va etre réécrit, un index perimé ne doit pas etre utilisé.
+    """
+    try:
+        os.remove(chemin_index(path))
+    except FileNotFoundError:
+        pass
+
+
+class Header(NamedTuple):
+    """
+    Informations lues dans le header d'un fichier ULBMP. 'profondeur', 'rle' et 'palette' ne concernent que la version
+    3 du format (la palette est la suite de bytes RGB brute, vide en profondeur 24).
+    """
+    version: int
+    taille_header: int
+    largeur: int
+    hauteur: int
+    profondeur: int = 24
+    rle: bool = False
+    palette: bytes = b''
+
+
+def lire_header(file):
+    """
+    Lit et verifie le header d'un fichier ULBMP ouvert en lecture binaire, le fichier est ensuite positionné au debut
+    des bytes representant les pixels. Return le Header.
+    """
+    data = file.read(12)
+    version = data[5]
+    header = data[:6]
+    width_and_height = data[8:12]
+    expected_header = bytes.fromhex(f'554c424d500{version}')
+    if header != expected_header or len(width_and_height) != 4:
+        raise Exception('Incorrect format')
+    header_size = int.from_bytes(data[6:8], 'little')
+    largeur = int.from_bytes(width_and_height[0:2], 'little')
+    hauteur = int.from_bytes(width_and_height[2:], 'little')
+    if version != 3:
+        return Header(version, header_size, largeur, hauteur)
+    depth_and_rle = file.read(2)
+    palette = file.read(header_size - 14)
+    if len(depth_and_rle) != 2 or len(palette) != header_size - 14:
+        raise Exception('Incorrect format')
+    return Header(version, header_size, largeur, hauteur, depth_and_rle[0], depth_and_rle[1] == 1, palette)
+
+
+class Decoder:
+    @staticmethod
+    def load_from(path: str, workers=1, stats=None):
+        """
+        Lit le header du fichier donné par le path en parametre pour recuperer la version, la largeur et la hauteur de
+        l'image (et la palette pour la version 3), lit ensuite les bytes representant les pixels, initialise un buffer
+        de pixels vide, ecrit les canaux RGB des pixels dans ce buffer selon la version du format et return l'image
+        definie par la largeur, la hauteur et le buffer. Avec workers > 1, les pixels sont decodés par morceaux dans
+        plusieurs processus (voir parallel.decode_parallele), sauf pour la version 4 sans index des lignes. Avec
+        stats=Statistiques(), la durée de chaque phase et les compteurs des blocs lus sont ajoutés aux statistiques
+        (sauf les compteurs du decodage en plusieurs processus, dont les bytes ne passent pas par ce processus).
+        """
+        with open(path, 'rb') as file:
+            with phase(stats, 'header'):
+                header = lire_header(file)
+            version, largeur, hauteur = header.version, header.largeur, header.hauteur
+            pixels_expected = largeur * hauteur
+            if workers > 1 and pixels_expected and version in (1, 2, 3, 4):
+                from parallel import decode_parallele
+                with phase(stats, 'pixels'):
+                    buffer = decode_parallele(path, header, file.tell(), workers)
+                if buffer is not None:
+                    if stats is not None:
+                        stats.terminer()
+                    return Image(largeur, hauteur, buffer)
+            with phase(stats, 'lecture'):
+                if version == 1:
+                    # les pixels de la version 1 sont deja au format du buffer : lecture directe dans le buffer
+                    bytes_pixels = buffer = bytearray(pixels_expected * 3)
+                    if file.readinto(buffer) != len(buffer):
+                        raise Exception('Incorrect format')
+                else:
+                    bytes_pixels = file.read()
+            with phase(stats, 'pixels'):
+                if version != 1:
+                    buffer = decode_pixels(header, bytes_pixels)
+                image = Image(largeur, hauteur, buffer)
+            if stats is not None:
+                stats.analyser(version, header.profondeur, header.rle, bytes_pixels, file.tell() - len(bytes_pixels))
+                stats.terminer()
+            return image
+
+    @staticmethod
+    async def aload(path: str, executor=None, limite=None):
+        """
+        Version asynchrone de load_from pour une boucle asyncio : le fichier est lu dans un thread puis decodé dans
+        'executor' (un ThreadPoolExecutor ou un ProcessPoolExecutor, le pool de threads par defaut de la boucle
+        sinon), la boucle n'est donc jamais bloquée. 'limite', un asyncio.Semaphore partagé entre les appels, borne le
+        nombre de decodages en cours, les suivants attendent leur tour sans occuper l'executor. La tache peut etre
+        annulée à tout moment (un decodage deja commencé dans l'executor se termine mais son resultat est ignoré).
+        Return l'image.
+        """
+        async with limite or nullcontext():
+            data = await asyncio.to_thread(lire_fichier, path)
+            return await asyncio.get_running_loop().run_in_executor(executor, decode_bytes, data)
+
+    @staticmethod
+    def open_stream(path: str, taille_chunk=TAILLE_CHUNK, premiere_ligne=0):
+        """
+        Ouvre le fichier donné par le path en parametre et lit uniquement son header. Return un FluxULBMP (à utiliser
+        avec 'with') qui decode ensuite les pixels par morceaux de 'taille_chunk' bytes, à partir de la ligne
+        'premiere_ligne' (en utilisant l'index des lignes du fichier s'il en a un, voir FluxULBMP.positionner).
+        """
+        file = open(path, 'rb')
+        try:
+            flux = FluxULBMP(file, lire_header(file), taille_chunk)
+            if premiere_ligne:
+                flux.positionner(premiere_ligne, lire_index(path) if flux.taille_variable() else None)
+            return flux
+        except Exception:
+            file.close()
+            raise
+
+    @staticmethod
+    def open_mmap(path: str):
+        """
+        Ouvre un fichier de la version 1 ou de la version 3 sans RLE, dont chaque pixel occupe un nombre fixe de bits
+        à une position calculable depuis le header, et le projette en memoire. Return une ImageMmap (à utiliser avec
+        'with') qui ne decode que les pixels, lignes ou zones demandés. Leve une ValueError pour les autres versions.
+        """
+        file = open(path, 'rb')
+        try:
+            header = lire_header(file)
+            if header.version not in (1, 3) or header.rle:
+                raise ValueError('Random access needs a version 1 or a version 3 file without RLE')
+            if header.profondeur not in PROFONDEURS:
+                raise Exception('Incorrect format')
+            return ImageMmap(file, header, file.tell())
+        except BaseException:
+            file.close()
+            raise
+
+    @staticmethod
+    def iter_rows(path: str, taille_chunk=TAILLE_CHUNK, premiere_ligne=0, derniere_ligne=None):
+        """
+        Generateur qui renvoie les lignes de l'image une par une (3 * largeur bytes RGB chacune) sans charger le
+        fichier entier ni construire l'image, la memoire utilisée ne depend que de la taille des morceaux lus. Seules
+        les lignes de 'premiere_ligne' à 'derniere_ligne' (exclue, jusqu'à la fin par defaut) sont renvoyées.
+        """
+        with Decoder.open_stream(path, taille_chunk, premiere_ligne) as flux:
+            nombre_lignes = None if derniere_ligne is None else max(derniere_ligne - premiere_ligne, 0)
+            yield from islice(flux.lignes(), nombre_lignes)
+
+    @staticmethod
+    def load_rows(path: str, debut: int, fin: int):
+        """
+        Decode uniquement les lignes de 'debut' à 'fin' (exclue), en partant de l'entrée de l'index la plus proche
+        quand le fichier en a un. Return ces lignes sous forme d'Image de meme largeur.
+        """
+        with Decoder.open_stream(path, TAILLE_CHUNK, debut) as flux:
+            buffer = bytearray().join(islice(flux.lignes(), max(fin - debut, 0)))
+            if len(buffer) != flux.largeur * (fin - debut) * 3:
+                raise IndexError
+            return Image(flux.largeur, fin - debut, buffer)
+
+
+def decode_pixels(header: Header, bytes_pixels):
+    """
+    Decode les bytes representant les pixels selon la version du header (les bytes en trop à la fin sont ignorés en
+    version 1). Return le buffer RGB.
+    """
+    pixels_expected = header.largeur * header.hauteur
+    if header.version == 1:
+        if len(bytes_pixels) < pixels_expected * 3:
+            raise Exception('Incorrect format')
+        return bytearray(bytes_pixels[:pixels_expected * 3])
+    if header.version == 2:
+        return decode_pixels_v2(bytes_pixels, bytearray())
+    if header.version == 3:
+        return decode_pixels_v3(header.palette, bytes_pixels, bytearray(), pixels_expected, header.profondeur,
+                                header.rle)
+    if header.version == 4:
+        return decode_pixels_v4(bytes_pixels, bytearray())
+    if header.version == 5:
+        return decode_pixels_v5(bytes_pixels, bytearray())
+    raise Exception('Incorrect format')
+
+
+def decode_bytes(data: bytes):
+    """
+    Decode une image ULBMP entiere deja lue en memoire (utilisée par Decoder.aload, dans un thread ou un autre
+    processus). Return l'image.
+    """
+    fichier = io.BytesIO(data)
+    header = lire_header(fichier)
+    return Image(header.largeur, header.hauteur, decode_pixels(header, data[fichier.tell():]))
+
+
+def encoder_detache(encoder: Encoder):
+    """
+    Encode l'image d'un Encoder dans un thread ou un autre processus (utilisée par Encoder.asave). Les pixels de la
+    version 1, une memoryview sur le buffer de l'image, sont copiés pour pouvoir etre renvoyés. Return le header, les
+    pixels à encoder et la profondeur.
+    """
+    header, pixels_to_encode, profondeur = encoder.encode()
+    if isinstance(pixels_to_encode, memoryview):
+        pixels_to_encode = bytes(pixels_to_encode)
+    return header, pixels_to_encode, profondeur
+
+
+def lire_fichier(path: str):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+class FluxULBMP:
+    def __init__(self, file, header: Header, taille_chunk=TAILLE_CHUNK):
+        """
+        Decodage incremental des pixels d'un fichier ULBMP dont le header a deja été lu. Les bytes sont lus par
+        morceaux de 'taille_chunk' bytes et seuls les blocs complets sont decodés, les bytes d'un bloc coupé entre deux
+        morceaux sont gardés pour le morceau suivant. L'etat qui traverse les morceaux et les lignes (pixel precedent de
+        la version 4 et 5, table des couleurs récentes de la version 5, nombre de pixels restants pour ignorer le
+        padding des profondeurs < 8) est gardé dans le flux.
+        """
+        self.file = file
+        self.header = header
+        self.largeur = header.largeur
+        self.hauteur = header.hauteur
+        self.taille_chunk = taille_chunk
+        self.debut_pixels = file.tell()
+        self.pixel_prec = (0, 0, 0)
+        self.table_v5 = [(0, 0, 0)] * 32
+        self.pixels_restants = header.largeur * header.hauteur
+        self.lignes_a_lire = header.hauteur
+        self.lignes_a_sauter = 0
+        self.bytes_ignores = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def taille_variable(self):
+        """
+        Return True si les pixels ne sont pas tous encodés sur le meme nombre de bits (version 2, version 3 avec RLE,
+        versions 4 et 5), une ligne ne peut alors etre atteinte qu'avec l'index des lignes ou en decodant les
+        precedentes (la version 5 n'a pas d'index, sa table des couleurs récentes depend de toutes les lignes
+        precedentes).
+        """
+        return self.header.version in (2, 4, 5) or self.header.rle
+
+    def positionner(self, ligne: int, index=None):
+        """
+        Place le flux, avant toute lecture, pour que lignes() commence à la ligne donnée. Si chaque ligne occupe un
+        nombre entier de bytes (version 1 et version 3 sans RLE), sa position est calculée directement. Sinon le flux
+        part de l'entrée de l'index (IndexLignes) la plus proche avant la ligne : position du bloc, pixels du bloc deja
+        comptés dans les lignes precedentes et pixel precedent de la version 4. Les lignes entre cette entrée et la
+        ligne demandée (toutes les precedentes sans index) sont decodées puis ignorées.
+        """
+        if not 0 <= ligne <= self.hauteur:
+            raise IndexError
+        bits_ligne = self.largeur * self.header.profondeur
+        depart = 0
+        if not self.taille_variable() and bits_ligne % 8 == 0:
+            self.file.seek(self.debut_pixels + ligne * bits_ligne // 8)
+            depart = ligne
+        elif index is not None and index.entrees:
+            entree = min(ligne // index.pas, len(index.entrees) - 1)
+            position, pixels_ignores, self.pixel_prec = index.entrees[entree]
+            self.file.seek(self.debut_pixels + position)
+            self.bytes_ignores = pixels_ignores * 3
+            depart = entree * index.pas
+        self.lignes_a_lire = self.hauteur - depart
+        self.lignes_a_sauter = ligne - depart
+        self.pixels_restants = self.lignes_a_lire * self.largeur
+
+    def lignes(self):
+        """
+        Generateur des lignes de l'image (bytes RGB), un run ou un bloc qui deborde sur la ligne suivante est gardé
+        dans 'en_attente' jusqu'à ce que la ligne suivante soit complete. Leve une exception si le fichier se termine
+        avant la derniere ligne.
+        """
+        taille_ligne = self.largeur * 3
+        lignes_restantes = self.lignes_a_lire
+        reste = b''
+        en_attente = bytearray()
+        while lignes_restantes > 0:
+            chunk = self.file.read(self.taille_chunk)
+            if not chunk:
+                break
+            data = reste + chunk
+            rgb, consommes = self.decoder_chunk(data)
+            reste = data[consommes:]
+            en_attente += rgb
+            if self.bytes_ignores:
+                ignores = min(self.bytes_ignores, len(en_attente))
+                del en_attente[:ignores]
+                self.bytes_ignores -= ignores
+            while lignes_restantes > 0 and len(en_attente) >= taille_ligne:
+                if self.lignes_a_sauter:
+                    self.lignes_a_sauter -= 1
+                else:
+                    yield bytes(en_attente[:taille_ligne])
+                del en_attente[:taille_ligne]
+                lignes_restantes -= 1
+        if lignes_restantes > 0 and taille_ligne > 0:
+            raise Exception('Incorrect format')
+
+    def decoder_chunk(self, data):
+        """
+        Decode les blocs complets au debut de 'data' avec les fonctions de decodage de la version du fichier.
+        Return les bytes RGB obtenus et le nombre de bytes de 'data' consommés.
+        """
+        header = self.header
+        version, profondeur, rle = header.version, header.profondeur, header.rle
+        if version == 3 and profondeur == 24:
+            version = 2 if rle else 1
+        if version == 1:
+            consommes = len(data) - len(data) % 3
+            return data[:consommes], consommes
+        if version == 2:
+            consommes = len(data) - len(data) % 4
+            return decode_pixels_v2(data[:consommes], bytearray()), consommes
+        if version == 3:
+            consommes = len(data) - len(data) % 2 if profondeur == 8 and rle else len(data)
+            rgb = decode_pixels_v3(header.palette, data[:consommes], bytearray(), self.pixels_restants, profondeur,
+                                   rle)
+            self.pixels_restants -= len(rgb) // 3
+            return rgb, consommes
+        if version == 5:
+            consommes = longueur_blocs_complets_v4(data, LONGUEURS_V5)
+            rgb = decode_pixels_v5(data[:consommes], bytearray(), self.pixel_prec, self.table_v5)
+        else:
+            consommes = longueur_blocs_complets_v4(data)
+            rgb = decode_pixels_v4(data[:consommes], bytearray(), self.pixel_prec)
+        if rgb:
+            self.pixel_prec = tuple(rgb[-3:])
+        return rgb, consommes
+
+
+class ImageMmap:
+    def __init__(self, file, header: Header, debut_pixels: int):
+        """
+        Image en lecture seule dont les pixels restent dans le fichier, projeté en memoire avec mmap. Le pixel
+        d'indice i commence au bit i * profondeur des bytes de pixels (24 bits en version 1), une ligne ou une zone se
+        decode donc en ne lisant que les bytes qui la contiennent. Pour les profondeurs ≤ 8, 'table' donne pour chaque
+        valeur de byte les bytes RGB de tous les pixels qu'il contient.
+        """
+        self.file = file
+        self.header = header
+        self.largeur = header.largeur
+        self.hauteur = header.hauteur
+        self.profondeur = header.profondeur
+        self.debut_pixels = debut_pixels
+        self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < debut_pixels + -(-self.largeur * self.hauteur * self.profondeur // 8):
+            self.close()
+            raise Exception('Incorrect format')
+        self.table = table_pixels_v3(header.palette, self.profondeur) if self.profondeur != 24 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __getitem__(self, pos: tuple[int, int]):
+        x, y = pos
+        if not (0 <= x < self.largeur and 0 <= y < self.hauteur):
+            raise IndexError
+        position = x + y * self.largeur
+        return Pixel.from_int(int.from_bytes(self.pixels_rgb(position, position + 1)))
+
+    def get_width(self):
+        return self.largeur
+
+    def get_height(self):
+        return self.hauteur
+
+    def pixels_rgb(self, debut: int, fin: int):
+        """
+        Return les bytes RGB des pixels d'indices 'debut' à 'fin' (exclu), en ne lisant que les bytes du fichier qui
+        les contiennent. Pour les profondeurs < 8, les pixels qui partagent le premier byte avec des pixels precedents
+        sont decodés puis retirés.
+        """
+        if self.profondeur == 24:
+            return self.data[self.debut_pixels + debut * 3:self.debut_pixels + fin * 3]
+        pixels_par_byte = 8 // self.profondeur
+        premier_byte, dernier_byte = debut // pixels_par_byte, -(-fin // pixels_par_byte)
+        morceaux = list(map(self.table.__getitem__,
+                            self.data[self.debut_pixels + premier_byte:self.debut_pixels + dernier_byte]))
+        if None in morceaux:
+            raise Exception('Incorrect format')
+        decalage = (debut - premier_byte * pixels_par_byte) * 3
+        return b''.join(morceaux)[decalage:decalage + (fin - debut) * 3]
+
+    def ligne(self, y: int):
+        """
+        Return les bytes RGB de la ligne y.
+        """
+        if not 0 <= y < self.hauteur:
+            raise IndexError
+        return self.pixels_rgb(y * self.largeur, (y + 1) * self.largeur)
+
+    def crop(self, x: int, y: int, largeur: int, hauteur: int):
+        """
+        Decode uniquement la zone de 'largeur' x 'hauteur' pixels dont le coin superieur gauche est (x, y), ligne par
+        ligne (en une seule lecture si la zone fait toute la largeur de l'image). Return la zone sous forme d'Image.
+        """
+        if x < 0 or y < 0 or largeur < 0 or hauteur < 0 or x + largeur > self.largeur or y + hauteur > self.hauteur:
+            raise ValueError(f'Crop {largeur}x{hauteur} at ({x}, {y}) is outside the '
+                             f'{self.largeur}x{self.hauteur} image')
+        if largeur == self.largeur:
+            buffer = bytearray(self.pixels_rgb(y * self.largeur, (y + hauteur) * self.largeur))
+        else:
+            debuts = range(y * self.largeur + x, (y + hauteur) * self.largeur, self.largeur)
+            buffer = bytearray().join([self.pixels_rgb(debut, debut + largeur) for debut in debuts])
+        return Image(largeur, hauteur, buffer)
+
+    def get_buffer(self):
+        """
+        Decode toute l'image et return son buffer RGB (O(fichier), à reserver aux cas où tous les pixels servent).
+        """
+        return bytearray(self.pixels_rgb(0, self.largeur * self.hauteur))
+
+    def charger(self):
+        """
+        Return l'Image complete decodée.
+        """
+        return Image(self.largeur, self.hauteur, self.get_buffer())
+
+
+def decode_pixels_v1(bytes_pixels: bytes, buffer: bytearray):
+    """
+    Decodage de la version 1 du format ULBMP, la suite de bytes associés aux pixels est deja au format du buffer de
+    l'image (un byte par canal R, G et B), elle est donc copiée telle quelle à la fin du buffer. Return le buffer.
+    """
+    buffer += bytes_pixels[:len(bytes_pixels) - len(bytes_pixels) % 3]
+    return buffer
+
+
+def decode_pixels_v2(bytes_pixels: bytes, buffer: bytearray):
+    """
+    Decodage de la version 2 du format ULBMP, decoupe la suite de bytes associés aux pixels en blocs de 4 bytes, le
+    premier byte donne le nombre de fois qu'il faut multiplier le pixel, et le deuxieme, troisieme et quatrieme byte les
+    intensités des canaux rouge, vert et bleu respectivement, ajoute dans le buffer donné en parametre les 3 bytes RGB
+    de chaque bloc multipliés par le nombre du premier byte, en une seule concatenation. Return le buffer.
+    """
+    rapide = backend.accelere()
+    if rapide is not None:
+        return rapide.decode_pixels_v2(bytes_pixels, buffer)
+    nombre_blocs = len(bytes_pixels) // 4
+    couleurs = map(bytes, zip(bytes_pixels[1::4], bytes_pixels[2::4], bytes_pixels[3::4]))
+    buffer += b''.join(map(mul, couleurs, bytes_pixels[0:nombre_blocs * 4:4]))
+    return buffer
+
+
+def decode_pixels_v3(palette: bytes, bytes_pixels: bytes, buffer: bytearray, pixels_expected: int, depth: int,
+                     rle=False):
+    """
+    Decodage de la version 3 du format ULBMP, prend en parametre les suites de bytes composant la palette et les pixels,
+    un buffer vide, le nombre de pixels attendus, la profondeur et le RLE (sur False par defaut), decoupe la palette en
+    une liste de couleurs de 3 bytes, dans le cas d'une profondeur 24, utilise le decodage de la version 1 si le RLE
+    n'est pas activé, et le decodage de la version 2 s'il l'est, dans le cas d'une profondeur de 8, si le RLE n'est
+    pas activé, parcourt la suite bytes qui composent les indices referencant la palette, et ajoute dans le buffer la
+    couleur correspondant à l'indice dans la palette, si le RLE est activé, parcourt la suite de bytes 2 par 2,
+    effectue le meme traitement pour le deuxieme byte, mais multiplié par le nombre donné dans le premier byte, pour
+    les profondeurs ≤ 4, appelle la fonction decode_depth_under_8 pour construire le buffer, return le buffer.
+    """
+    liste_palette = [palette[i:i + 3] for i in range(0, len(palette) - 2, 3)]
+    if depth == 24:
+        if not rle:
+            buffer = decode_pixels_v1(bytes_pixels, buffer)
+        elif rle:
+            buffer = decode_pixels_v2(bytes_pixels, buffer)
+    rapide = backend.accelere()
+    if depth == 8 and rapide is not None:
+        if rle:
+            return rapide.decode_rle_v3(bytes_pixels, buffer, liste_palette)
+        return rapide.decode_depth_under_8(bytes_pixels, 8, buffer, liste_palette, len(bytes_pixels))
+    if depth == 8:
+        if not rle:
+            buffer += b''.join([liste_palette[indice_palette] for indice_palette in bytes_pixels])
+        elif rle:
+            for i in range(0, len(bytes_pixels) - 1, 2):
+                number_of_pixels, indice_palette = bytes_pixels[i], bytes_pixels[i + 1]
+                buffer += liste_palette[indice_palette] * number_of_pixels
+    elif depth in (1, 2, 4):
+        buffer = decode_depth_under_8(bytes_pixels, depth, buffer, liste_palette, pixels_expected)
+    return buffer
+
+
+def decode_depth_under_8(bytes_pixels, depth, buffer, liste_palette, pixels_expected):
+    """
+    Fonction appelée lors du decodage de la version 3 lorsque la profondeur ≤ 4, prend en parametre la suite de byte
+    representant les pixels, la profondeur, le buffer dans lequel ajouter les pixels, la liste representant
+    la palette, et le nombre de pixels attendus. Chaque byte complet est remplacé par les couleurs RGB de ses
+    8 // depth pixels lues dans une table de 256 entrées (voir table_pixels_v3), en une seule concatenation. Les
+    pixels du dernier byte incomplet sont decodés un par un pour ignorer les bits de padding. Leve une IndexError si un
+    indice depasse la palette. Return le buffer.
+    """
+    rapide = backend.accelere()
+    if rapide is not None:
+        return rapide.decode_depth_under_8(bytes_pixels, depth, buffer, liste_palette, pixels_expected)
+    pixels_par_byte = 8 // depth
+    bytes_complets = min(len(bytes_pixels), pixels_expected // pixels_par_byte)
+    morceaux = list(map(table_pixels_v3(b''.join(liste_palette), depth).__getitem__, bytes_pixels[:bytes_complets]))
+    if None in morceaux:
+        raise IndexError('list index out of range')
+    buffer += b''.join(morceaux)
+    pixels_restants = min(pixels_expected - bytes_complets * pixels_par_byte, pixels_par_byte)
+    if pixels_restants > 0 and bytes_complets < len(bytes_pixels):
+        byte = bytes_pixels[bytes_complets]
+        for i in range(8 - depth, 8 - depth * (pixels_restants + 1), -depth):
+            buffer += liste_palette[(byte >> i) & ((1 << depth) - 1)]
+    return buffer
+
+
+@lru_cache(maxsize=64)
+def table_pixels_v3(palette: bytes, profondeur: int):
+    """
+    Return la table des 256 valeurs possibles d'un byte de pixels de la version 3 en profondeur ≤ 8 : pour chaque byte,
+    la concatenation des couleurs RGB des 8 / profondeur indices qu'il contient (bits de poids fort en premier), ou None
+    si l'un de ces indices depasse la palette. Les tables sont gardées en cache par palette et profondeur (le decodage
+    par morceaux la redemande pour chaque morceau).
+    """
+    couleurs = [palette[i:i + 3] for i in range(0, len(palette) - 2, 3)]
+    masque = (1 << profondeur) - 1
+    table = []
+    for byte in range(256):
+        indices = [(byte >> decalage) & masque for decalage in range(8 - profondeur, -1, -profondeur)]
+        table.append(b''.join([couleurs[indice] for indice in indices]) if max(indices) < len(couleurs) else None)
+    return table
+
+
+def decode_pixels_v4(bytes_pixels: bytes, buffer: bytearray, pixel_prec=(0, 0, 0)):
+    """
+    Decodage de la version 4 du format ULBMP, part du pixel precedent donné (noir par defaut). Le type de chaque bloc
+    est lu dans la table TYPES_V4 à partir de son premier byte, les deltas des blocs SMALL_DIFF et les deltas du
+    second byte des blocs INTERMEDIATE_DIFF sont lus dans des tables precalculées, ceux des blocs BIG_DIFF sont
+    reconstitués à partir des 3 bytes du bloc. Les canaux RGB sont écrits directement dans un bytearray préalloué
+    (un bloc fait au moins un byte, donc au plus un pixel par byte), l'affectation levant une ValueError si un canal
+    sort de l'intervalle [0, 255]. Ajoute les pixels au buffer et le return.
+    """
+    types, deltas_small, deltas_intermediate = TYPES_V4, DELTAS_SMALL_V4, DELTAS_INTERMEDIATE_V4
+    sortie = bytearray(3 * len(bytes_pixels))
+    red, green, blue = pixel_prec
+    i = j = 0
+    taille = len(bytes_pixels)
+    while i < taille:
+        byte0 = bytes_pixels[i]
+        type_bloc = types[byte0]
+        if type_bloc == SMALL_DIFF:
+            delta_r, delta_g, delta_b = deltas_small[byte0]
+            red, green, blue = red + delta_r, green + delta_g, blue + delta_b
+            i += 1
+        elif type_bloc == INTERMEDIATE_DIFF:
+            delta_g = byte0 - 96  # (byte0 & 0b111111) - 32
+            delta_rg, delta_bg = deltas_intermediate[bytes_pixels[i + 1]]
+            red, green, blue = red + delta_g + delta_rg, green + delta_g, blue + delta_g + delta_bg
+            i += 2
+        elif type_bloc == NEW_PIXEL:
+            red, green, blue = bytes_pixels[i + 1], bytes_pixels[i + 2], bytes_pixels[i + 3]
+            i += 4
+        elif type_bloc == INVALIDE:
+            raise Exception('Incorrect format')
+        else:  # BIG_DIFF_R, BIG_DIFF_G ou BIG_DIFF_B
+            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
+            delta1 = (((byte0 & 0b1111) << 4) | (byte1 >> 4)) - 128
+            delta2 = (((byte1 & 0b1111) << 2) | (byte2 >> 6)) - 32 + delta1
+            delta3 = (byte2 & 0b111111) - 32 + delta1
+            if type_bloc == BIG_DIFF_R:
+                red, green, blue = red + delta1, green + delta2, blue + delta3
+            elif type_bloc == BIG_DIFF_G:
+                red, green, blue = red + delta2, green + delta1, blue + delta3
+            else:
+                red, green, blue = red + delta2, green + delta3, blue + delta1
+            i += 3
+        sortie[j] = red
+        sortie[j + 1] = green
+        sortie[j + 2] = blue
+        j += 3
+    del sortie[j:]
+    buffer += sortie
+    return buffer
+
+
+def decode_pixels_v5(bytes_pixels: bytes, buffer: bytearray, pixel_prec=(0, 0, 0), table=None):
+    """
+    Decodage de la version 5 du format ULBMP (voir encode_rgb_v5), part du pixel precedent et de la table des couleurs
+    récentes donnés (noir et 32 cases noires par defaut, la table est modifiée sur place pour le decodage par morceaux).
+    Le type de chaque bloc est lu dans la table TYPES_V5 à partir de son premier byte, les blocs de la version 4 sont
+    decodés comme dans decode_pixels_v4 et un bloc INDEX relit une case de la table, puis la couleur obtenue est rangée
+    dans la table (sans effet pour un bloc INDEX), et un bloc RUN répete le pixel precedent par une seule affectation de
+    tranche. Les canaux sont écrits dans un bytearray préalloué de 3 bytes par byte lu, agrandi après un run pour garder
+    3 bytes par byte restant. Ajoute les pixels au buffer et le return.
+    """
+    types, deltas_small, deltas_intermediate = TYPES_V5, DELTAS_SMALL_V4, DELTAS_INTERMEDIATE_V4
+    if table is None:
+        table = [(0, 0, 0)] * 32
+    taille = len(bytes_pixels)
+    sortie = bytearray(3 * taille)
+    red, green, blue = pixel_prec
+    i = j = 0
+    while i < taille:
+        byte0 = bytes_pixels[i]
+        type_bloc = types[byte0]
+        if type_bloc == SMALL_DIFF:
+            delta_r, delta_g, delta_b = deltas_small[byte0]
+            red, green, blue = red + delta_r, green + delta_g, blue + delta_b
+            i += 1
+        elif type_bloc == INDEX:
+            red, green, blue = table[byte0 & 0b11111]
+            i += 1
+        elif type_bloc == RUN_SHORT or type_bloc == RUN_LONG:
+            if type_bloc == RUN_SHORT:
+                longueur = byte0 - 0xDF
+                i += 1
+            else:
+                longueur = (((byte0 & 0b1111) << 8) | bytes_pixels[i + 1]) + 32
+                i += 2
+            fin = j + 3 * longueur
+            if fin + 3 * (taille - i) > len(sortie):
+                sortie += bytes(fin + 3 * (taille - i) - len(sortie))
+            sortie[j:fin] = bytes((red, green, blue)) * longueur
+            j = fin
+            continue
+        elif type_bloc == INTERMEDIATE_DIFF:
+            delta_g = byte0 - 96  # (byte0 & 0b111111) - 32
+            delta_rg, delta_bg = deltas_intermediate[bytes_pixels[i + 1]]
+            red, green, blue = red + delta_g + delta_rg, green + delta_g, blue + delta_g + delta_bg
+            i += 2
+        elif type_bloc == NEW_PIXEL:
+            red, green, blue = bytes_pixels[i + 1], bytes_pixels[i + 2], bytes_pixels[i + 3]
+            i += 4
+        else:  # BIG_DIFF_R, BIG_DIFF_G ou BIG_DIFF_B
+            byte1, byte2 = bytes_pixels[i + 1], bytes_pixels[i + 2]
+            delta1 = (((byte0 & 0b1111) << 4) | (byte1 >> 4)) - 128
+            delta2 = (((byte1 & 0b1111) << 2) | (byte2 >> 6)) - 32 + delta1
+            delta3 = (byte2 & 0b111111) - 32 + delta1
+            if type_bloc == BIG_DIFF_R:
+                red, green, blue = red + delta1, green + delta2, blue + delta3
+            elif type_bloc == BIG_DIFF_G:
+                red, green, blue = red + delta2, green + delta1, blue + delta3
+            else:
+                red, green, blue = red + delta2, green + delta3, blue + delta1
+            i += 3
+        sortie[j] = red
+        sortie[j + 1] = green
+        sortie[j + 2] = blue
+        j += 3
+        table[(3 * red + 5 * green + 7 * blue) & 31] = (red, green, blue)
+    del sortie[j:]
+    buffer += sortie
+    return buffer
+
+
+def longueur_blocs_complets_v4(bytes_pixels, longueurs=None):
+    """
+    Parcourt les premiers bytes des blocs de la version 4 pour trouver la longueur de chaque bloc dans la table
+    LONGUEURS_V4 (ou LONGUEURS_V5 pour la version 5). Return le nombre de bytes occupés par les blocs complets au
+    debut de la suite de bytes, un bloc coupé à la fin n'est pas compté.
+    """
+    if longueurs is None:
+        longueurs = LONGUEURS_V4
+    i = 0
+    taille = len(bytes_pixels)
+    while i < taille:
+        increment = longueurs[bytes_pixels[i]]
+        if increment == 0:
+            raise Exception('Incorrect format')
+        if i + increment > taille:
+            break
+        i += increment
+    return i
+
+
+def tables_v4():
+    """
+    Precalcule les tables de decodage de la version 4 indexées par un byte : le type de bloc et sa longueur selon le
+    premier byte, les deltas (R, G, B) d'un bloc SMALL_DIFF, et les deltas (R - G, B - G) contenus dans le second byte
+    d'un bloc INTERMEDIATE_DIFF. Les premiers bytes 0xB0 à 0xFE ne correspondent à aucun bloc.
+    """
+    types, longueurs, deltas_small, deltas_intermediate = [], [], [], []
+    for byte in range(256):
+        if byte == 255:
+            type_bloc, longueur = NEW_PIXEL, 4
+        elif byte >> 6 == 0:
+            type_bloc, longueur = SMALL_DIFF, 1
+        elif byte >> 6 == 1:
+            type_bloc, longueur = INTERMEDIATE_DIFF, 2
+        elif byte >> 4 in (8, 9, 10):
+            type_bloc, longueur = (BIG_DIFF_R, BIG_DIFF_G, BIG_DIFF_B)[(byte >> 4) - 8], 3
+        else:
+            type_bloc, longueur = INVALIDE, 0
+        types.append(type_bloc)
+        longueurs.append(longueur)
+        deltas_small.append((((byte >> 4) & 0b11) - 2, ((byte >> 2) & 0b11) - 2, (byte & 0b11) - 2))
+        deltas_intermediate.append(((byte >> 4) - 8, (byte & 0b1111) - 8))
+    return types, longueurs, deltas_small, deltas_intermediate
+
+
+def tables_v5():
+    """
+    Tables de la version 5 indexées par le premier byte d'un bloc : type et longueur du bloc. Les blocs de la
+    version 4 sont inchangés, les premiers bytes 0xB0 à 0xFE qu'elle n'utilise pas sont ceux des blocs RUN_LONG
+    (0xB0 à 0xBF, 2 bytes), INDEX (0xC0 à 0xDF, 1 byte) et RUN_SHORT (0xE0 à 0xFE, 1 byte).
+    """
+    types, longueurs = list(TYPES_V4), list(LONGUEURS_V4)
+    for byte in range(0xB0, 0xFF):
+        if byte < 0xC0:
+            types[byte], longueurs[byte] = RUN_LONG, 2
+        elif byte < 0xE0:
+            types[byte], longueurs[byte] = INDEX, 1
+        else:
+            types[byte], longueurs[byte] = RUN_SHORT, 1
+    return types, longueurs
+
+
+SMALL_DIFF, INTERMEDIATE_DIFF, BIG_DIFF_R, BIG_DIFF_G, BIG_DIFF_B, NEW_PIXEL, INVALIDE = range(7)
+INDEX, RUN_SHORT, RUN_LONG = range(7, 10)
+TYPES_V4, LONGUEURS_V4, DELTAS_SMALL_V4, DELTAS_INTERMEDIATE_V4 = tables_v4()
+BYTES_SMALL_V4 = {DELTAS_SMALL_V4[byte]: byte for byte in range(64)}
+TYPES_V5, LONGUEURS_V5 = tables_v5()
+TABLES_DECALAGE = [bytes((byte << decalage) & 0xFF for byte in range(256)) for decalage in range(8)]
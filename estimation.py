@@ -0,0 +1,117 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Estimation de la taille et du coût d'encodage de chaque variante du format ULBMP à partir de statistiques de l'image,
+utilisée par Encoder.auto pour n'encoder que la variante choisie.
+"""
+
+from colorstats import nombre_couleurs
+from encoding import BYTES_SMALL_V4, detecter_runs
+from image import entiers_rgb
+from palette import PROFONDEURS
+
+TAILLE_ECHANTILLON_V4 = 1 << 14
+
+# coûts approximatifs en nanosecondes, mesurés avec benchmark.py sur images_rapport et les images synthetiques :
+# par pixel, par bloc de run (versions 2 et 3 avec RLE), par byte supplementaire d'un bloc de la version 4, et par
+# byte écrit
+COUT_PIXEL = {'v1': 1, 'v2': 110, 'v3_d1': 210, 'v3_d2': 200, 'v3_d4': 230, 'v3_d8': 130, 'v3_d8_rle': 200,
+              'v3_d24': 1, 'v3_d24_rle': 110, 'v4': 260}
+COUT_BLOC_RUN = 420
+COUT_BYTE_V4 = 400
+COUT_BYTE_ECRIT = 1
+
+
+def histogramme_v4(buffer, taille_echantillon=TAILLE_ECHANTILLON_V4):
+    """
+    Histogramme des types de blocs de la version 4 sur un echantillon de pixels regulierement espacés, chaque pixel
+    comparé à son vrai pixel precedent (comme dans encode_rgb_v4). Return un dictionnaire longueur du bloc (1 : SMALL,
+    2 : INTERMEDIATE, 3 : BIG, 4 : NEW_PIXEL) -> proportion des pixels.
+    """
+    nombre_pixels = len(buffer) // 3
+    pas = max(1, nombre_pixels // taille_echantillon)
+    histogramme = dict.fromkeys((1, 2, 3, 4), 0)
+    for pixel in range(0, nombre_pixels, pas):
+        red, green, blue = buffer[pixel * 3:pixel * 3 + 3]
+        red_prec, green_prec, blue_prec = buffer[pixel * 3 - 3:pixel * 3] if pixel else (0, 0, 0)
+        delta_r, delta_g, delta_b = red - red_prec, green - green_prec, blue - blue_prec
+        delta_rg, delta_bg = delta_r - delta_g, delta_b - delta_g
+        if (delta_r, delta_g, delta_b) in BYTES_SMALL_V4:
+            longueur = 1
+        elif -32 <= delta_g <= 31 and -8 <= delta_rg <= 7 and -8 <= delta_bg <= 7:
+            longueur = 2
+        elif ((-128 <= delta_r <= 127 and -32 <= -delta_rg <= 31 and -32 <= delta_b - delta_r <= 31)
+              or (-128 <= delta_g <= 127 and -32 <= delta_rg <= 31 and -32 <= delta_bg <= 31)
+              or (-128 <= delta_b <= 127 and -32 <= delta_r - delta_b <= 31 and -32 <= -delta_bg <= 31)):
+            longueur = 3
+        else:
+            longueur = 4
+        histogramme[longueur] += 1
+    echantillon = sum(histogramme.values())
+    return {longueur: nombre / echantillon for longueur, nombre in histogramme.items()} if echantillon else histogramme
+
+
+def statistiques(image):
+    """
+    Statistiques d'une image utilisées pour les estimations : nombre de pixels, couleurs uniques (comptées jusqu'à
+    257 seulement), nombre de runs et nombre de blocs de runs (un run de L pixels donne L // 255 + 1 blocs), et
+    histogramme des blocs de la version 4 sur un echantillon. Return un dictionnaire.
+    """
+    buffer = image.get_buffer()
+    entiers = entiers_rgb(buffer)
+    _, longueurs = detecter_runs(entiers)
+    return {
+        'pixels': len(entiers),
+        'couleurs': nombre_couleurs(buffer, 256),
+        'runs': len(longueurs),
+        'blocs_runs': len(longueurs) + sum(longueur // 255 for longueur in longueurs),
+        'histogramme_v4': histogramme_v4(buffer),
+    }
+
+
+def estimer_variantes(stats):
+    """
+    Estime la taille du fichier et le coût d'encodage de chaque variante possible pour l'image decrite par 'stats'.
+    Les tailles sont exactes pour les versions 1, 2 et 3 (elles ne dependent que du nombre de pixels, de couleurs et
+    de blocs de runs), celle de la version 4 est extrapolée de l'histogramme. Les profondeurs de la version 3 trop
+    petites pour la palette sont ignorées. Return la liste des estimations (dictionnaires avec le nom de la variante,
+    la version, les options de l'Encoder, la taille et le coût en nanosecondes).
+    """
+    pixels, couleurs, blocs = stats['pixels'], stats['couleurs'], stats['blocs_runs']
+    bytes_par_pixel_v4 = sum(longueur * part for longueur, part in stats['histogramme_v4'].items()) or 1
+    variantes = [('v1', 1, {}, 12 + 3 * pixels, 0),
+                 ('v2', 2, {}, 12 + 4 * blocs, blocs),
+                 ('v4', 4, {}, 12 + round(pixels * bytes_par_pixel_v4), 0),
+                 ('v3_d24', 3, {'depth': 24, 'rle': False}, 14 + 3 * pixels, 0),
+                 ('v3_d24_rle', 3, {'depth': 24, 'rle': True}, 14 + 4 * blocs, blocs)]
+    for profondeur in PROFONDEURS[:-1]:
+        if couleurs > 2 ** profondeur:
+            continue
+        header = 14 + 3 * couleurs
+        variantes.append((f'v3_d{profondeur}', 3, {'depth': profondeur, 'rle': False},
+                          header + -(-pixels * profondeur // 8), 0))
+        if profondeur == 8:
+            variantes.append(('v3_d8_rle', 3, {'depth': 8, 'rle': True}, header + 2 * blocs, blocs))
+    estimations = []
+    for nom, version, options, taille, blocs_runs in variantes:
+        cout = COUT_PIXEL[nom] * pixels + COUT_BLOC_RUN * blocs_runs + COUT_BYTE_ECRIT * taille
+        if version == 4:
+            cout += COUT_BYTE_V4 * pixels * (bytes_par_pixel_v4 - 1)
+        estimations.append({'variante': nom, 'version': version, 'options': options, 'taille': taille,
+                            'cout_ns': round(cout)})
+    return estimations
+
+
+def choisir_variante(estimations, goal='size'):
+    """
+    Return l'estimation gagnante : la plus petite taille (puis le plus petit coût) pour goal='size', le plus petit
+    coût (puis la plus petite taille) pour goal='speed'.
+    """
+    if goal == 'size':
+        return min(estimations, key=lambda estimation: (estimation['taille'], estimation['cout_ns']))
+    if goal == 'speed':
+        return min(estimations, key=lambda estimation: (estimation['cout_ns'], estimation['taille']))
+    raise ValueError(f"Unknown goal {goal!r}, expected 'size' or 'speed'")
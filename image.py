@@ -1,61 +1,259 @@
-"""
-NOM : Saou
-PRÉNOM : Ayman
-SECTION : B1-INFO
-MATRICULE : 000593526
-"""
-
-
-from pixel import Pixel
-
-
-class Image:
-    def __init__(self, width: int, height: int, pixels: list[Pixel]):
-        nombre_pixels = 0
-        for pixel in pixels:
-            if type(pixel) is not Pixel:
-                raise Exception
-            nombre_pixels += 1
-        if nombre_pixels != (width * height):
-            raise Exception
-        self.largeur = width
-        self.hauteur = height
-        self.liste = pixels
-
-    def __getitem__(self, pos: tuple[int, int]):
-        position_pixel = pos[0] + pos[1] * self.largeur
-        self.erreur_index(position_pixel)
-        return self.liste[position_pixel]
-
-    def __setitem__(self, pos: tuple[int, int], pix: Pixel):
-        position_pixel = pos[0] + pos[1] * self.largeur
-        self.erreur_index(position_pixel)
-        self.liste[position_pixel] = pix
-
-    def __eq__(self, other):
-        return self.largeur == other.largeur and self.hauteur == other.hauteur and self.liste == other.liste
-
-    def get_width(self):
-        return self.largeur
-
-    def get_height(self):
-        return self.hauteur
-
-    def get_pixels(self):
-        return self.liste
-
-    def get_unique_pixels(self):
-        """
-        Return une liste composée des pixels uniques.
-        """
-        return list(set(self.liste))
-
-    def erreur_index(self, position):
-        if position not in range(len(self.liste)):
-            raise IndexError
-
-
-    def encode_palette(self):
-        liste_pixels = self.pixels
-        palette = list(set(liste_pixels))
-        return palette
\ No newline at end of file
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+"""
+
+import hashlib
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from pixel import Pixel
+
+
+class Image:
+    def __init__(self, width: int, height: int, pixels):
+        """
+        Les pixels sont stockés dans un unique bytearray contigu de 3 * largeur * hauteur bytes (R, G, B pour chaque
+        pixel, ligne par ligne). 'pixels' peut etre une liste de Pixel (convertie en buffer) ou directement une suite
+        de bytes RGB ; un bytearray est utilisé tel quel sans copie, ce qui permet aux decodeurs de construire l'image
+        sans passer par des objets Pixel. Les lignes modifiées par __setitem__ sont notées avec un numero de
+        modification croissant (voir lignes_modifiees_depuis), ce qui permet à un Encoder incremental de ne reencoder
+        que les bandes touchées depuis son dernier encodage.
+        """
+        if isinstance(pixels, bytearray):
+            buffer = pixels
+        elif isinstance(pixels, (bytes, memoryview)):
+            buffer = bytearray(pixels)
+        else:
+            buffer = bytearray()
+            for pixel in pixels:
+                if type(pixel) is not Pixel:
+                    raise Exception
+                buffer += bytes(pixel.get_rgb())
+        if len(buffer) != (width * height * 3):
+            raise Exception
+        self.largeur = width
+        self.hauteur = height
+        self.buffer = buffer
+        self.modification = 0
+        self.lignes_modifiees = {}
+        self.empreinte_calculee = None
+
+    def __getitem__(self, pos: tuple[int, int]):
+        position_pixel = pos[0] + pos[1] * self.largeur
+        self.erreur_index(position_pixel)
+        return self.pixel_at(position_pixel)
+
+    def __setitem__(self, pos: tuple[int, int], pix: Pixel):
+        position_pixel = pos[0] + pos[1] * self.largeur
+        self.erreur_index(position_pixel)
+        self.buffer[position_pixel * 3:position_pixel * 3 + 3] = bytes(pix.get_rgb())
+        self.modification += 1
+        self.lignes_modifiees[position_pixel // self.largeur] = self.modification
+        self.empreinte_calculee = None
+
+    def __eq__(self, other):
+        """
+        Compare les dimensions puis les buffers (une comparaison de bytes, sans construire de Pixel). Les empreintes
+        ne sont pas utilisées, elles peuvent ne plus correspondre au buffer après une écriture directe.
+        """
+        return self.largeur == other.largeur and self.hauteur == other.hauteur and self.buffer == other.buffer
+
+    def empreinte(self):
+        """
+        Return l'empreinte du contenu de l'image (BLAKE2b de 16 bytes des dimensions et du buffer RGB), calculée une
+        seule fois puis gardée jusqu'à la prochaine modification par __setitem__ ou marquer_lignes. Deux images de
+        meme contenu ont la meme empreinte, ce qui permet de verifier des fichiers en ne gardant que les empreintes
+        des originaux. Une écriture directe dans get_buffer() doit etre suivie de marquer_lignes, sinon l'empreinte
+        gardée est celle du contenu precedent.
+        """
+        if self.empreinte_calculee is None:
+            empreinte = hashlib.blake2b(digest_size=16)
+            empreinte.update(self.largeur.to_bytes(2, 'little') + self.hauteur.to_bytes(2, 'little'))
+            empreinte.update(self.buffer)
+            self.empreinte_calculee = empreinte.digest()
+        return self.empreinte_calculee
+
+    def diff(self, other):
+        """
+        Compare deux images de memes dimensions ligne par ligne (comparaison de bytes de chaque ligne). Dans les
+        lignes differentes, le premier et le dernier byte different sont trouvés par dichotomie sur des tranches de
+        memoryview. Return None si les images sont identiques, sinon une Difference : position (x, y) du premier
+        pixel different et boite (x, y, largeur, hauteur) qui contient tous les pixels differents, dans le format de
+        ImageMmap.crop. Leve une ValueError si les dimensions different.
+        """
+        if self.largeur != other.largeur or self.hauteur != other.hauteur:
+            raise ValueError(f'Cannot diff a {self.largeur}x{self.hauteur} image with a '
+                             f'{other.largeur}x{other.hauteur} image')
+        if self.buffer == other.buffer:
+            return None
+        gauche, droite = memoryview(self.buffer), memoryview(other.buffer)
+        taille_ligne = self.largeur * 3
+        premier, x_min, x_max, y_min, y_max = None, self.largeur, -1, None, None
+        for y in range(self.hauteur):
+            ligne_gauche = gauche[y * taille_ligne:(y + 1) * taille_ligne]
+            ligne_droite = droite[y * taille_ligne:(y + 1) * taille_ligne]
+            if ligne_gauche == ligne_droite:
+                continue
+            debut = premier_ecart(ligne_gauche, ligne_droite) // 3
+            fin = dernier_ecart(ligne_gauche, ligne_droite) // 3
+            if premier is None:
+                premier, y_min = (debut, y), y
+            x_min, x_max, y_max = min(x_min, debut), max(x_max, fin), y
+        return Difference(premier, (x_min, y_min, x_max - x_min + 1, y_max - y_min + 1))
+
+    def get_width(self):
+        return self.largeur
+
+    def get_height(self):
+        return self.hauteur
+
+    def get_buffer(self):
+        """
+        Return le bytearray RGB de l'image, utilisé directement par l'encodeur et le decodeur.
+        """
+        return self.buffer
+
+    def marquer_lignes(self, debut: int, fin: int):
+        """
+        Note les lignes de 'debut' à 'fin' (exclue) comme modifiées, à appeler apres avoir modifié le buffer
+        directement (get_buffer) plutot qu'avec __setitem__.
+        """
+        self.modification += 1
+        self.empreinte_calculee = None
+        self.lignes_modifiees.update(dict.fromkeys(range(max(debut, 0), min(fin, self.hauteur)), self.modification))
+
+    def get_modification(self):
+        """
+        Return le numero de la derniere modification, à garder pour appeler plus tard lignes_modifiees_depuis.
+        """
+        return self.modification
+
+    def lignes_modifiees_depuis(self, modification: int):
+        """
+        Return la liste triée des lignes modifiées apres la modification donnée.
+        """
+        return sorted(ligne for ligne, numero in self.lignes_modifiees.items() if numero > modification)
+
+    def get_pixels(self):
+        """
+        Return une vue sur les pixels de l'image qui se comporte comme une liste de Pixel, les Pixel sont construits
+        à la demande à partir du buffer.
+        """
+        return VuePixels(self)
+
+    def get_unique_pixels(self):
+        """
+        Return la liste des pixels uniques dans l'ordre de leur premiere apparition (voir colorstats.couleurs_uniques).
+        """
+        from colorstats import couleurs_uniques
+        return list(map(Pixel.from_int, couleurs_uniques(self.buffer)))
+
+    def pixel_at(self, position):
+        """
+        Return le Pixel (partagé, voir Pixel.from_int) à la position donnée dans le buffer (indice du pixel, pas du
+        byte).
+        """
+        i = position * 3
+        return Pixel.from_int(int.from_bytes(self.buffer[i:i + 3]))
+
+    def erreur_index(self, position):
+        if position not in range(self.largeur * self.hauteur):
+            raise IndexError
+
+
+class Difference(NamedTuple):
+    """
+    Resultat de Image.diff : premier pixel different (x, y) dans l'ordre du buffer et boite (x, y, largeur, hauteur)
+    des pixels differents.
+    """
+    premier: tuple
+    boite: tuple
+
+
+def premier_ecart(gauche, droite):
+    """
+    Return l'indice du premier byte different de deux suites de meme longueur qui different, par dichotomie : la
+    partie gauche de l'intervalle restant est comparée en une fois, l'ecart est à droite si elle est identique.
+    """
+    debut, fin = 0, len(gauche)
+    while fin - debut > 1:
+        milieu = (debut + fin) // 2
+        if gauche[debut:milieu] == droite[debut:milieu]:
+            debut = milieu
+        else:
+            fin = milieu
+    return debut
+
+
+def dernier_ecart(gauche, droite):
+    """
+    Return l'indice du dernier byte different de deux suites de meme longueur qui different (voir premier_ecart).
+    """
+    debut, fin = 0, len(gauche)
+    while fin - debut > 1:
+        milieu = (debut + fin) // 2
+        if gauche[milieu:fin] == droite[milieu:fin]:
+            fin = milieu
+        else:
+            debut = milieu
+    return debut
+
+
+class VuePixels(Sequence):
+    """
+    Vue en lecture seule sur le buffer d'une image, indexable et itérable comme l'ancienne liste de pixels.
+    """
+    def __init__(self, image: Image):
+        self.image = image
+
+    def __len__(self):
+        return self.image.largeur * self.image.hauteur
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self.image.pixel_at(i) for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        self.image.erreur_index(indice)
+        return self.image.pixel_at(indice)
+
+    def __iter__(self):
+        return map(Pixel.from_int, entiers_rgb(self.image.buffer))
+
+    def __eq__(self, other):
+        if isinstance(other, VuePixels):
+            return self.image.buffer == other.image.buffer
+        return list(self) == list(other)
+
+
+def entiers_rgb(buffer):
+    """
+    Convertit un buffer RGB en une suite d'entiers 24 bits 0xRRGGBB (un par pixel) sans boucle Python : les canaux
+    sont recopiés par tranches dans des mots de 4 bytes, puis le bytearray est réinterprété comme un tableau d'entiers
+    non signés. Return une memoryview d'entiers, comparables et hashables directement.
+    """
+    mots = bytearray(len(buffer) // 3 * 4)
+    if sys.byteorder == 'little':
+        mots[0::4], mots[1::4], mots[2::4] = buffer[2::3], buffer[1::3], buffer[0::3]
+    else:
+        mots[1::4], mots[2::4], mots[3::4] = buffer[0::3], buffer[1::3], buffer[2::3]
+    return memoryview(mots).cast('I')
+
+
+def buffer_rgb(entiers):
+    """
+    Inverse de entiers_rgb : convertit une suite d'entiers 24 bits 0xRRGGBB en buffer RGB, en passant par un tableau
+    de mots de 4 bytes dont les canaux sont recopiés par tranches. Return un bytearray.
+    """
+    mots = array('I', entiers).tobytes()
+    buffer = bytearray(len(mots) // 4 * 3)
+    if sys.byteorder == 'little':
+        buffer[2::3], buffer[1::3], buffer[0::3] = mots[0::4], mots[1::4], mots[2::4]
+    else:
+        buffer[0::3], buffer[1::3], buffer[2::3] = mots[1::4], mots[2::4], mots[3::4]
+    return buffer
@@ -0,0 +1,94 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Encodage incremental : un Encoder créé avec incremental=K garde les bandes d'environ K lignes encodées lors de son
+dernier save_to, les sauvegardes suivantes ne reencodent que les bandes dont une ligne a été modifiée depuis (voir
+Image.lignes_modifiees_depuis) et recollent les autres telles quelles :
+    encoder = Encoder(image, 4, incremental=16)
+    encoder.save_to(path)
+    image[10, 200] = Pixel(255, 0, 0)
+    encoder.save_to(path)  # seule la bande qui contient la ligne 200 est reencodée
+"""
+
+from bisect import bisect_right
+
+from parallel import bornes_bandes, encoder_pixels_bande, recoller_bandes
+
+
+class CacheBandes:
+    def __init__(self, bornes, couleurs, profondeur):
+        """
+        Etat gardé par l'Encoder entre deux encodages : bornes des bandes (en pixels, voir parallel.bornes_bandes),
+        palette et profondeur de la version 3 avec lesquelles les bandes ont été encodées, bytes ou segment de runs de
+        chaque bande, pixel precedent utilisé pour chaque bande (version 4) et numero de la derniere modification de
+        l'image prise en compte.
+        """
+        self.bornes = bornes
+        self.couleurs = couleurs
+        self.profondeur = profondeur
+        self.bandes = [None] * (len(bornes) - 1)
+        self.pixels_prec = [None] * (len(bornes) - 1)
+        self.modification = 0
+
+
+def bandes_modifiees(bornes, largeur, lignes):
+    """
+    Return l'ensemble des bandes qui contiennent au moins un pixel des lignes données (une ligne peut etre à cheval
+    sur deux bandes, les bornes étant alignées sur 8 pixels).
+    """
+    bandes = set()
+    for ligne in lignes:
+        premiere = bisect_right(bornes, ligne * largeur) - 1
+        derniere = bisect_right(bornes, (ligne + 1) * largeur - 1) - 1
+        bandes.update(range(premiere, derniere + 1))
+    return bandes
+
+
+def pixel_prec_bande(buffer, debut):
+    return tuple(buffer[debut * 3 - 3:debut * 3]) if debut else (0, 0, 0)
+
+
+def encode_incremental(encoder, palette, profondeur):
+    """
+    Encode les pixels de l'image de l'Encoder donné en ne reencodant que les bandes modifiées depuis son dernier
+    encodage, ainsi que les bandes de la version 4 dont le pixel precedent (dernier pixel de la bande d'avant) a
+    changé. Tout est reencodé au premier appel et quand la palette ou la profondeur de la version 3 change, puisque
+    les indices de toutes les bandes en dependent. Les bandes sont recollées comme celles de l'encodage en plusieurs
+    processus, le resultat est donc identique à un encodage complet. Le nombre de bandes reencodées est gardé dans
+    encoder.bandes_reencodees. Return les pixels à encoder.
+    """
+    image = encoder.image
+    buffer = image.get_buffer()
+    version = encoder.version
+    rle = version == 2 or encoder.rle_actif(profondeur)
+    if version == 3 and profondeur == 24:
+        if not rle:
+            return encoder.encode_pixels_v1()
+        version = 2
+    if len(buffer) == 0:
+        return encoder.encode_pixels_v3(palette, profondeur) if version == 3 else bytearray()
+    couleurs = palette.couleurs if palette is not None else None
+    modification = image.get_modification()
+    cache = encoder.cache_bandes
+    if cache is None or cache.couleurs != couleurs or cache.profondeur != profondeur:
+        nombre_bandes = -(-encoder.hauteur // encoder.incremental)
+        cache = CacheBandes(bornes_bandes(encoder.largeur, encoder.hauteur, nombre_bandes), couleurs, profondeur)
+        a_encoder = set(range(len(cache.bandes)))
+    else:
+        a_encoder = bandes_modifiees(cache.bornes, encoder.largeur, image.lignes_modifiees_depuis(cache.modification))
+    if version == 4:
+        a_encoder.update(bande for bande, debut in enumerate(cache.bornes[:-1])
+                         if cache.pixels_prec[bande] != pixel_prec_bande(buffer, debut))
+    for bande in sorted(a_encoder):
+        debut, fin = cache.bornes[bande], cache.bornes[bande + 1]
+        pixel_prec = pixel_prec_bande(buffer, debut)
+        cache.bandes[bande] = encoder_pixels_bande(bytes(buffer[debut * 3:fin * 3]), pixel_prec, version, profondeur,
+                                                   rle, couleurs)
+        cache.pixels_prec[bande] = pixel_prec
+    cache.modification = modification
+    encoder.cache_bandes = cache
+    encoder.bandes_reencodees = len(a_encoder)
+    return recoller_bandes(cache.bandes, rle, 3 if couleurs is None else 1)
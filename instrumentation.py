@@ -0,0 +1,124 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Instrumentation optionnelle de Encoder.save_to et Decoder.load_from :
+    stats = Statistiques(callback=envoyer_metriques)
+    Encoder(image, 4, stats=stats).save_to(path)
+    stats.as_dict()  # {'phases_ns': {...}, 'blocs_v4': {...}, 'blocs_v5': {...}, 'runs': {...}, 'bytes_header': ...}
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+NOMS_BLOCS_V4 = ('small', 'intermediate', 'big_r', 'big_g', 'big_b', 'new')
+NOMS_BLOCS_V5 = NOMS_BLOCS_V4 + ('index', 'run_short', 'run_long')
+
+
+class Statistiques:
+    def __init__(self, callback=None):
+        """
+        Mesures d'un ou plusieurs encodages ou decodages, qui s'additionnent : durée de chaque phase en nanosecondes
+        (header, palette, pixels, lecture, ecriture), nombre de blocs de chaque type des versions 4 et 5, histogramme
+        des longueurs des runs (versions 2, 3 avec RLE et 5) et nombre de bytes du header et des pixels. Les compteurs
+        sont calculés en parcourant les bytes des pixels apres coup, l'encodage et le decodage eux-memes ne sont pas
+        modifiés. 'callback' est appelée avec les statistiques à la fin de chaque operation.
+        """
+        self.callback = callback
+        self.phases = {}
+        self.blocs_v4 = dict.fromkeys(NOMS_BLOCS_V4, 0)
+        self.blocs_v5 = dict.fromkeys(NOMS_BLOCS_V5, 0)
+        self.runs = Counter()
+        self.bytes_header = 0
+        self.bytes_pixels = 0
+
+    @contextmanager
+    def phase(self, nom):
+        """
+        Ajoute la durée du bloc 'with' à la phase donnée.
+        """
+        debut = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.phases[nom] = self.phases.get(nom, 0) + time.perf_counter_ns() - debut
+
+    def analyser(self, version, profondeur, rle, bytes_pixels, taille_header):
+        """
+        Compte les bytes produits ou lus, puis les blocs de la version 4 ou 5 (type lu dans TYPES_V4 ou TYPES_V5 à
+        partir du premier byte de chaque bloc) ou les runs des formats avec RLE (les blocs consecutifs de meme valeur,
+        un run de plus de 255 pixels étant decoupé en plusieurs blocs, sont regroupés en un seul run). Pour la
+        version 5, un run est un pixel suivi des blocs RUN_SHORT et RUN_LONG qui le répetent.
+        """
+        from encoding import INVALIDE, LONGUEURS_V4, LONGUEURS_V5, RUN_LONG, RUN_SHORT, TYPES_V4, TYPES_V5
+        self.bytes_header += taille_header
+        self.bytes_pixels += len(bytes_pixels)
+        if version == 4:
+            compteurs = [0] * len(NOMS_BLOCS_V4)
+            i = 0
+            while i < len(bytes_pixels) and LONGUEURS_V4[bytes_pixels[i]]:
+                compteurs[TYPES_V4[bytes_pixels[i]]] += 1
+                i += LONGUEURS_V4[bytes_pixels[i]]
+            for nom, nombre in zip(NOMS_BLOCS_V4, compteurs):
+                self.blocs_v4[nom] += nombre
+        elif version == 5:
+            compteurs = [0] * (len(NOMS_BLOCS_V5) + 1)
+            longueur = 0
+            i = 0
+            while i < len(bytes_pixels) and LONGUEURS_V5[bytes_pixels[i]]:
+                type_bloc = TYPES_V5[bytes_pixels[i]]
+                compteurs[type_bloc] += 1
+                if type_bloc == RUN_SHORT:
+                    longueur += bytes_pixels[i] - 0xDF
+                elif type_bloc == RUN_LONG:
+                    longueur += (((bytes_pixels[i] & 0b1111) << 8) | bytes_pixels[i + 1]) + 32
+                else:
+                    if longueur:
+                        self.runs[longueur] += 1
+                    longueur = 1
+                i += LONGUEURS_V5[bytes_pixels[i]]
+            if longueur:
+                self.runs[longueur] += 1
+            del compteurs[INVALIDE]
+            for nom, nombre in zip(NOMS_BLOCS_V5, compteurs):
+                self.blocs_v5[nom] += nombre
+        elif version == 2 or (version == 3 and rle):
+            taille_bloc = 2 if version == 3 and profondeur == 8 else 4
+            longueur, valeur_prec = 0, None
+            for i in range(0, len(bytes_pixels) - taille_bloc + 1, taille_bloc):
+                valeur = bytes_pixels[i + 1:i + taille_bloc]
+                if longueur and valeur != valeur_prec:
+                    self.runs[longueur] += 1
+                    longueur = 0
+                longueur += bytes_pixels[i]
+                valeur_prec = valeur
+            if longueur:
+                self.runs[longueur] += 1
+
+    def terminer(self):
+        if self.callback is not None:
+            self.callback(self)
+
+    def as_dict(self):
+        """
+        Return les statistiques sous forme de dictionnaire (serialisable en JSON, les clés de l'histogramme des runs
+        sont les longueurs).
+        """
+        return {
+            'phases_ns': dict(self.phases),
+            'blocs_v4': dict(self.blocs_v4),
+            'blocs_v5': dict(self.blocs_v5),
+            'runs': dict(sorted(self.runs.items())),
+            'bytes_header': self.bytes_header,
+            'bytes_pixels': self.bytes_pixels,
+        }
+
+
+def phase(stats, nom):
+    """
+    Return le contexte qui mesure la phase si l'instrumentation est activée, un contexte vide sinon.
+    """
+    return stats.phase(nom) if stats is not None else nullcontext()
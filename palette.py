@@ -0,0 +1,78 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+"""
+
+from colorstats import couleurs_uniques
+from image import entiers_rgb
+
+PROFONDEURS = (1, 2, 4, 8, 24)
+
+
+class Palette:
+    def __init__(self, couleurs: list[int]):
+        """
+        Palette de la version 3 du format ULBMP, les couleurs sont stockées sous forme d'entiers 24 bits 0xRRGGBB.
+        Le dictionnaire 'indices' associe chaque couleur à son indice dans la palette, il est construit une seule fois
+        et donne l'indice d'un pixel en O(1) pour toutes les profondeurs et pour le RLE.
+        """
+        self.couleurs = couleurs
+        self.indices = {couleur: indice for indice, couleur in enumerate(couleurs)}
+
+    @staticmethod
+    def from_buffer(buffer):
+        """
+        Construit la palette des couleurs uniques d'un buffer RGB, dans l'ordre de leur premiere apparition (voir
+        colorstats.couleurs_uniques) pour que deux encodages de la meme image donnent le meme fichier.
+        """
+        return Palette(couleurs_uniques(buffer))
+
+    @staticmethod
+    def from_couleurs(couleurs):
+        """
+        Construit une palette à partir d'une liste de couleurs données sous forme de Pixel ou de tuples (R, G, B), dans
+        l'ordre donné.
+        """
+        palette = []
+        for couleur in couleurs:
+            red, green, blue = couleur.get_rgb() if hasattr(couleur, 'get_rgb') else couleur
+            palette.append((red << 16) | (green << 8) | blue)
+        return Palette(palette)
+
+    def __len__(self):
+        return len(self.couleurs)
+
+    def to_bytes(self):
+        """
+        Return la palette binaire ajoutée au header : l'intensité des canaux RGB de chaque couleur sur un byte chacun.
+        """
+        return b''.join([couleur.to_bytes(3) for couleur in self.couleurs])
+
+    def indices_from_buffer(self, buffer):
+        """
+        Return les indices de palette des pixels du buffer, un byte par pixel. Leve une ValueError si un pixel n'est
+        pas dans la palette.
+        """
+        try:
+            return bytes(map(self.indices.__getitem__, entiers_rgb(buffer)))
+        except KeyError as erreur:
+            raise ValueError(f'Colour {erreur.args[0]:06x} is not in the palette') from None
+
+    def profondeur_minimale(self):
+        """
+        Return la plus petite profondeur de la version 3 capable d'indexer toutes les couleurs de la palette, 24 si
+        la palette contient plus de 256 couleurs.
+        """
+        for profondeur in PROFONDEURS[:-1]:
+            if len(self.couleurs) <= 2 ** profondeur:
+                return profondeur
+        return 24
+
+    def verifier_profondeur(self, profondeur):
+        """
+        Leve une ValueError si la palette contient plus de couleurs que la profondeur ne permet d'en indexer.
+        """
+        if profondeur != 24 and len(self.couleurs) > 2 ** profondeur:
+            raise ValueError(f'Palette of {len(self.couleurs)} colours does not fit in depth {profondeur}')
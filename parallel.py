@@ -0,0 +1,203 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+"""
+
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from multiprocessing import shared_memory
+
+from encoding import (EncodeurRuns, decode_pixels_v2, decode_pixels_v3, decode_pixels_v4, empaqueter_indices,
+                      encode_rgb_v4, lire_index, segment_runs)
+from image import entiers_rgb
+from palette import Palette
+
+
+def bornes_bandes(largeur, hauteur, nombre_bandes, alignement=8):
+    """
+    Decoupe l'image en bandes horizontales de hauteurs egales, le debut de chaque bande est ramené à un multiple de
+    'alignement' pixels pour que les indices de la version 3 en profondeur < 8 d'une bande ne partagent pas de byte
+    avec la bande precedente. Return la liste des bornes (en pixels) des bandes non vides.
+    """
+    nombre_pixels = largeur * hauteur
+    bornes = []
+    for bande in range(nombre_bandes):
+        debut = (bande * hauteur // nombre_bandes) * largeur
+        debut -= debut % alignement
+        if not bornes or debut > bornes[-1]:
+            bornes.append(debut)
+    if bornes[-1] < nombre_pixels:
+        bornes.append(nombre_pixels)
+    return bornes
+
+
+def encoder_bande(nom, debut, fin, version, profondeur, rle, couleurs):
+    """
+    Encode les pixels [debut, fin[ du buffer RGB en memoire partagée (executée dans un processus fils, voir
+    encoder_pixels_bande).
+    """
+    memoire = shared_memory.SharedMemory(name=nom)
+    try:
+        bande = bytes(memoire.buf[debut * 3:fin * 3])
+        pixel_prec = tuple(memoire.buf[debut * 3 - 3:debut * 3]) if debut else (0, 0, 0)
+    finally:
+        memoire.close()
+    return encoder_pixels_bande(bande, pixel_prec, version, profondeur, rle, couleurs)
+
+
+def encoder_pixels_bande(bande, pixel_prec, version, profondeur, rle, couleurs):
+    """
+    Encode une bande de pixels RGB. Les formats sans etat entre les pixels (version 3 sans RLE) et la version 4 (dont
+    le pixel precedent est celui juste avant la bande) donnent directement leurs bytes, les formats avec RLE donnent
+    un segment (premier run, bytes, dernier run) à recoller avec les bandes voisines (voir recoller_bandes).
+    """
+    if version == 4:
+        return encode_rgb_v4(bande, pixel_prec)
+    if couleurs is None:
+        return segment_runs(entiers_rgb(bande), bande, 3)
+    indices = Palette(couleurs).indices_from_buffer(bande)
+    if rle:
+        return segment_runs(indices, indices, 1)
+    return indices if profondeur == 8 else empaqueter_indices(indices, profondeur)
+
+
+def encode_parallele(encoder, palette, profondeur):
+    """
+    Encode les pixels de l'image de l'Encoder donné en bandes horizontales dans un ProcessPoolExecutor de
+    encoder.workers processus. Le buffer est copié une seule fois dans une memoire partagée que les processus lisent
+    directement, seuls les bytes encodés reviennent au processus principal. Les bandes sont recollées dans l'ordre :
+    par simple concatenation, ou en prolongeant les runs coupés entre deux bandes pour les formats avec RLE, de sorte
+    que le resultat est identique à l'encodage en un seul processus. Return les pixels à encoder.
+    """
+    buffer = encoder.image.get_buffer()
+    version = encoder.version
+    rle = version == 2 or encoder.rle_actif(profondeur)
+    if version == 3 and profondeur == 24:
+        if not rle:
+            return encoder.encode_pixels_v1()
+        version = 2
+    couleurs = palette.couleurs if palette is not None else None
+    bornes = bornes_bandes(encoder.largeur, encoder.hauteur, encoder.workers)
+    if len(buffer) == 0:
+        return encoder.encode_pixels_v3(palette, profondeur) if version == 3 else bytearray()
+    memoire = shared_memory.SharedMemory(create=True, size=len(buffer))
+    try:
+        memoire.buf[:len(buffer)] = buffer
+        with ProcessPoolExecutor(max_workers=encoder.workers) as executor:
+            bandes = list(executor.map(encoder_bande, [memoire.name] * (len(bornes) - 1), bornes[:-1], bornes[1:],
+                                       [version] * (len(bornes) - 1), [profondeur] * (len(bornes) - 1),
+                                       [rle] * (len(bornes) - 1), [couleurs] * (len(bornes) - 1)))
+    finally:
+        memoire.close()
+        memoire.unlink()
+    return recoller_bandes(bandes, rle, 3 if couleurs is None else 1)
+
+
+def recoller_bandes(bandes, rle, taille_valeur):
+    """
+    Recolle dans l'ordre les bandes encodées par encoder_pixels_bande : par simple concatenation, ou en prolongeant
+    les runs coupés entre deux bandes pour les formats avec RLE. Return les pixels à encoder.
+    """
+    if not rle:
+        return bytearray().join(bandes)
+    runs = EncodeurRuns(taille_valeur)
+    pixels_to_encode = bytearray()
+    for premier, corps, dernier in bandes:
+        pixels_to_encode += runs.ajouter_run(*premier)
+        if dernier is not None:
+            pixels_to_encode += runs.vider()
+            pixels_to_encode += corps
+            runs.ajouter_run(*dernier)
+    pixels_to_encode += runs.vider()
+    return pixels_to_encode
+
+
+def decoupage_decodage(path, header, debut_pixels, nombre_bandes):
+    """
+    Decoupe les bytes des pixels d'un fichier en morceaux decodables independamment. Return la liste des morceaux
+    (position dans le fichier, nombre de bytes, premier pixel, pixel de fin, pixel precedent), ou None si le fichier
+    ne peut pas etre decoupé (version 4 sans index des lignes).
+    - version 1 et version 3 sans RLE : chaque pixel occupe un nombre fixe de bits, les bandes de bornes_bandes
+      (alignées sur 8 pixels pour les profondeurs < 8) donnent directement leurs positions ;
+    - version 2 et version 3 avec RLE : un pré-parcours des occurences (premier byte de chaque bloc) donne le premier
+      pixel de chaque bloc, chaque bande est coupée à la limite de bloc la plus proche avant sa borne ;
+    - version 4 : les bandes partent des entrées de l'index des lignes (position et pixel precedent).
+    """
+    largeur, hauteur, version = header.largeur, header.hauteur, header.version
+    nombre_pixels = largeur * hauteur
+    taille_pixels = os.path.getsize(path) - debut_pixels
+    if version == 4:
+        index = lire_index(path)
+        if index is None or not index.entrees:
+            return None
+        entrees = sorted({(bande * hauteur // nombre_bandes) // index.pas for bande in range(nombre_bandes)})
+        coupures = [(index.entrees[entree][0], entree * index.pas * largeur, index.entrees[entree][2])
+                    for entree in entrees]
+    elif version == 2 or header.rle:
+        taille_bloc = 2 if version == 3 and header.profondeur == 8 else 4
+        with open(path, 'rb') as file:
+            file.seek(debut_pixels)
+            occurences = file.read()[0:taille_pixels - taille_pixels % taille_bloc:taille_bloc]
+        fins = [0] + list(accumulate(occurences))
+        if fins[-1] != nombre_pixels:
+            raise Exception('Incorrect format')
+        blocs = sorted({bisect_right(fins, borne) - 1 for borne in bornes_bandes(largeur, hauteur, nombre_bandes)[:-1]})
+        coupures = [(bloc * taille_bloc, fins[bloc], (0, 0, 0)) for bloc in blocs]
+    else:
+        bornes = bornes_bandes(largeur, hauteur, nombre_bandes)[:-1]
+        coupures = [(borne * header.profondeur // 8, borne, (0, 0, 0)) for borne in bornes]
+        taille_pixels = -(-nombre_pixels * header.profondeur // 8)
+    fins = [(position, pixel) for position, pixel, _ in coupures[1:]] + [(taille_pixels, nombre_pixels)]
+    return [(debut_pixels + position, fin_position - position, pixel, fin_pixel, pixel_prec)
+            for (position, pixel, pixel_prec), (fin_position, fin_pixel) in zip(coupures, fins)]
+
+
+def decoder_bande(nom, path, header, position, taille, debut, fin, pixel_prec):
+    """
+    Lit 'taille' bytes du fichier à partir de 'position', les decode avec les fonctions de la version du fichier
+    (executée dans un processus fils) et écrit les pixels [debut, fin[ obtenus directement dans le buffer RGB en
+    memoire partagée. Leve une exception si le morceau ne donne pas exactement ces pixels.
+    """
+    with open(path, 'rb') as file:
+        file.seek(position)
+        data = file.read(taille)
+    if header.version == 1:
+        rgb = data
+    elif header.version == 2:
+        rgb = decode_pixels_v2(data, bytearray())
+    elif header.version == 3:
+        rgb = decode_pixels_v3(header.palette, data, bytearray(), fin - debut, header.profondeur, header.rle)
+    else:
+        rgb = decode_pixels_v4(data, bytearray(), pixel_prec)
+    if len(rgb) != (fin - debut) * 3:
+        raise Exception('Incorrect format')
+    memoire = shared_memory.SharedMemory(name=nom)
+    try:
+        memoire.buf[debut * 3:fin * 3] = rgb
+    finally:
+        memoire.close()
+
+
+def decode_parallele(path, header, debut_pixels, workers):
+    """
+    Decode les pixels d'un fichier dans un ProcessPoolExecutor de 'workers' processus : chaque processus lit et decode
+    son morceau du fichier (voir decoupage_decodage) et écrit les canaux RGB dans une memoire partagée de la taille de
+    l'image, seules les positions des morceaux sont envoyées aux processus et rien ne revient à part les erreurs.
+    Return le buffer RGB de l'image, ou None si le fichier ne peut pas etre decodé en parallele.
+    """
+    morceaux = decoupage_decodage(path, header, debut_pixels, workers)
+    if morceaux is None:
+        return None
+    memoire = shared_memory.SharedMemory(create=True, size=header.largeur * header.hauteur * 3)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for futur in [executor.submit(decoder_bande, memoire.name, path, header, *morceau) for morceau in morceaux]:
+                futur.result()
+        return bytearray(memoire.buf[:header.largeur * header.hauteur * 3])
+    finally:
+        memoire.close()
+        memoire.unlink()
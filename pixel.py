@@ -1,47 +1,82 @@
-"""
-NOM : Saou
-PRÉNOM : Ayman
-SECTION : B1-INFO
-MATRICULE : 000593526
-"""
-
-
-class Pixel:
-    def __init__(self, R: int, G: int, B: int):
-        if R < 0 or R > 255 or G < 0 or G > 255 or B < 0 or B > 255:
-            raise Exception('Intensity out of range')
-        self.__red = R
-        self.__green = G
-        self.__blue = B
-
-    def get_red(self):
-        return self.__red
-
-    def get_green(self):
-        return self.__green
-
-    def get_blue(self):
-        return self.__blue
-
-    def get_rgb(self):
-        """
-        Return un tuple composé de l'intensité des canaux RGB.
-        :return:
-        """
-        return self.__red, self.__green, self.__blue
-
-    def __eq__(self, other):
-        return self.get_rgb() == other.get_rgb()
-
-    def __hash__(self):
-        """
-        Permet de rendre le type Pixel 'hashable' afin de pouvoir convertir une liste de pixels en un set.
-        """
-        return hash(self.get_rgb())
-
-    def get_delta(self, other):
-        """
-        Prend en parametre deux pixels et return un tuple composé de la difference de couleurs entre ces deux pixels
-        """
-        return (other.get_red() - self.get_red(), other.get_green() - self.get_green(), other.get_blue() -
-                self.get_blue())
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+"""
+
+TAILLE_CACHE = 1 << 16
+
+
+class Pixel:
+    __slots__ = ('__red', '__green', '__blue')
+
+    def __init__(self, R: int, G: int, B: int):
+        """
+        Les canaux sont stockés dans des slots (pas de __dict__ par instance). Un Pixel n'est jamais modifié apres sa
+        construction, les memes instances peuvent donc etre partagées entre toutes les images (voir from_int).
+        """
+        if R < 0 or R > 255 or G < 0 or G > 255 or B < 0 or B > 255:
+            raise Exception('Intensity out of range')
+        self.__red = R
+        self.__green = G
+        self.__blue = B
+
+    @staticmethod
+    def from_int(couleur: int):
+        """
+        Return le Pixel de la couleur 24 bits 0xRRGGBB donnée (voir image.entiers_rgb). Les Pixel sont partagés
+        (flyweight) : le cache associe chaque couleur deja demandée à son unique instance, de sorte qu'une image de
+        palette ou avec de longs runs ne crée qu'un Pixel par couleur. Le cache est limité à TAILLE_CACHE couleurs,
+        les couleurs suivantes donnent des Pixel non partagés.
+        """
+        pixel = CACHE_PIXELS.get(couleur)
+        if pixel is None:
+            if couleur < 0 or couleur > 0xFFFFFF:
+                raise Exception('Intensity out of range')
+            pixel = Pixel(couleur >> 16, (couleur >> 8) & 0xFF, couleur & 0xFF)
+            if len(CACHE_PIXELS) < TAILLE_CACHE:
+                CACHE_PIXELS[couleur] = pixel
+        return pixel
+
+    def get_red(self):
+        return self.__red
+
+    def get_green(self):
+        return self.__green
+
+    def get_blue(self):
+        return self.__blue
+
+    def get_rgb(self):
+        """
+        Return un tuple composé de l'intensité des canaux RGB.
+        :return:
+        """
+        return self.__red, self.__green, self.__blue
+
+    def to_int(self):
+        """
+        Return la couleur du pixel sous forme d'entier 24 bits 0xRRGGBB.
+        """
+        return (self.__red << 16) | (self.__green << 8) | self.__blue
+
+    def __eq__(self, other):
+        return self is other or self.get_rgb() == other.get_rgb()
+
+    def __hash__(self):
+        """
+        Permet de rendre le type Pixel 'hashable' afin de pouvoir convertir une liste de pixels en un set, le hash est
+        celui de l'entier 0xRRGGBB.
+        """
+        return hash(self.to_int())
+
+    def get_delta(self, other):
+        """
+        Prend en parametre deux pixels et return un tuple composé de la difference de couleurs entre ces deux pixels
+        """
+        return (other.get_red() - self.get_red(), other.get_green() - self.get_green(), other.get_blue() -
+                self.get_blue())
+
+
+CACHE_PIXELS = {}
@@ -0,0 +1,39 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Verifie que le backend NumPy produit les memes fichiers que le backend de reference ('python') pour chaque variante
+de benchmark.VARIANTES, sur les images synthetiques du benchmark :
+    python -m pytest -q test_backend.py
+"""
+
+import pytest
+
+import backend
+from benchmark import VARIANTES, images_synthetiques
+from encoding import Decoder, Encoder
+
+pytest.importorskip('numpy')
+
+IMAGES = images_synthetiques(61, 37)
+
+
+@pytest.mark.parametrize('variante, version, options', VARIANTES, ids=[variante for variante, _, _ in VARIANTES])
+@pytest.mark.parametrize('nom', sorted(IMAGES))
+def test_backends_identiques(tmp_path, nom, variante, version, options):
+    image = IMAGES[nom]
+    fichiers = {}
+    for nom_backend in ('python', 'numpy'):
+        fichiers[nom_backend] = tmp_path / f'{variante}_{nom_backend}.ulbmp'
+        with backend.utiliser_backend(nom_backend):
+            try:
+                Encoder(image, version, **options).save_to(str(fichiers[nom_backend]))
+            except ValueError:
+                pytest.skip(f'{nom} cannot be encoded in {variante}')
+    assert fichiers['python'].read_bytes() == fichiers['numpy'].read_bytes()
+    with backend.utiliser_backend('python'):
+        reference = Decoder.load_from(str(fichiers['python']))
+    with backend.utiliser_backend('numpy'):
+        assert Decoder.load_from(str(fichiers['python'])) == reference == image
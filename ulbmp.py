@@ -0,0 +1,182 @@
+"""
+NOM : Saou
+PRÉNOM : Ayman
+SECTION : B1-INFO
+MATRICULE : 000593526
+
+Outil en ligne de commande pour les fichiers ULBMP :
+    python -m ulbmp transcode images_rapport/ -v 4 -o sortie/ -j 4
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from bmp import BmpDecoder
+from encoding import Decoder, Encoder, supprimer_index
+
+
+def trouver_fichiers(entrees):
+    """
+    Return la liste triée et sans doublons des fichiers .ulbmp designés par les entrées : un dossier donne tous les
+    fichiers .ulbmp qu'il contient (sous-dossiers compris), sinon l'entrée est interpretée comme un motif glob (qui
+    peut designer des fichiers .bmp, convertis directement en ULBMP).
+    """
+    fichiers = []
+    for entree in entrees:
+        if os.path.isdir(entree):
+            fichiers += glob.glob(os.path.join(entree, '**', '*.ulbmp'), recursive=True)
+        else:
+            fichiers += [fichier for fichier in glob.glob(entree, recursive=True) if os.path.isfile(fichier)]
+    return sorted(set(fichiers))
+
+
+def charger_image(path):
+    """
+    Charge une image ULBMP, ou BMP 24 bits si l'extension du fichier est .bmp.
+    """
+    if path.lower().endswith('.bmp'):
+        return BmpDecoder.load_from(path)
+    return Decoder.load_from(path)
+
+
+def nom_sortie(source, dossier, version, depth=None, rle=False, racine=None):
+    """
+    Return le chemin du fichier produit pour 'source' dans 'dossier', le nom indique la version (et la profondeur et le
+    RLE pour la version 3) pour que plusieurs conversions d'un meme fichier ne s'ecrasent pas. L'extension d'une
+    source qui n'est pas un .ulbmp est gardée dans le nom (checkers.bmp donne checkers_bmp.v4.ulbmp, à coté de
+    checkers.v4.ulbmp), et avec 'racine' le chemin de la source relatif à ce dossier est reproduit dans 'dossier'
+    (a/x.ulbmp et b/x.ulbmp donnent a/x.v4.ulbmp et b/x.v4.ulbmp).
+    """
+    nom, extension = os.path.splitext(os.path.basename(source))
+    if extension.lower() != '.ulbmp':
+        nom += '_' + extension.lstrip('.').lower()
+    nom += f'.v{version}'
+    if version == 3:
+        nom += f'_d{depth}' + ('_rle' if rle else '')
+    if racine is not None:
+        dossier = os.path.join(dossier, os.path.relpath(os.path.dirname(os.path.abspath(source)), racine))
+    return os.path.normpath(os.path.join(dossier, nom + '.ulbmp'))
+
+
+def destinations(fichiers, dossier, version, depth=None, rle=False):
+    """
+    Return la liste des chemins produits pour les fichiers (voir nom_sortie), relatifs au dossier parent commun de
+    toutes les sources.
+    """
+    if not fichiers:
+        return []
+    racine = os.path.commonpath([os.path.dirname(os.path.abspath(fichier)) for fichier in fichiers])
+    return [nom_sortie(fichier, dossier, version, depth, rle, racine) for fichier in fichiers]
+
+
+def transcoder_fichier(source, destination, version, options):
+    """
+    Decode 'source' (ULBMP ou BMP) puis l'encode dans la version demandée. L'encodage est écrit dans un fichier
+    temporaire unique du dossier de destination, renommé en 'destination' seulement une fois complet (os.replace est
+    atomique), un fichier de sortie n'est donc jamais à moitié écrit et deux conversions simultanées ne se genent pas.
+    L'index des lignes d'un ancien fichier de meme nom est supprimé avant le remplacement.
+    Return la taille du fichier source et celle du fichier produit.
+    """
+    image = charger_image(source)
+    os.makedirs(os.path.dirname(destination) or '.', exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(destination) or '.', suffix='.ulbmp.tmp')
+    os.close(descripteur)
+    try:
+        Encoder(image, version, **options).save_to(temporaire)
+        supprimer_index(destination)
+        os.replace(temporaire, destination)
+    except BaseException:
+        os.remove(temporaire)
+        raise
+    return os.path.getsize(source), os.path.getsize(destination)
+
+
+def transcode(fichiers, dossier, version, options, jobs=1, executor='thread', afficher=print):
+    """
+    Convertit tous les fichiers avec au plus 'jobs' conversions en cours à la fois dans un pool de threads ou de
+    processus, de sorte que les lectures et écritures d'un fichier se font pendant l'encodage d'un autre. Les fichiers
+    sont soumis au fur et à mesure (au plus 2 * jobs en attente) pour ne pas garder toutes les images en memoire.
+    Les sources qui donneraient le meme fichier de sortie sont comptées en erreur avant toute conversion. Return un
+    dictionnaire de statistiques : nombre d'images converties et en erreur, octets lus et écrits, durée, debits en
+    Mo/s (octets lus) et en images/s.
+    """
+    os.makedirs(dossier, exist_ok=True)
+    pool = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    stats = {'images': 0, 'erreurs': 0, 'octets_lus': 0, 'octets_ecrits': 0}
+    debut = time.perf_counter()
+    chemins = destinations(fichiers, dossier, version, options.get('depth'), options.get('rle'))
+    sources = {}
+    for source, destination in zip(fichiers, chemins):
+        sources.setdefault(destination, []).append(source)
+    for destination, doublons in sources.items():
+        if len(doublons) > 1:
+            stats['erreurs'] += len(doublons)
+            afficher(f"{', '.join(doublons)} >> error: same output file {destination}")
+    a_convertir = [(source, destination) for source, destination in zip(fichiers, chemins)
+                   if len(sources[destination]) == 1]
+    with pool(max_workers=jobs) as executeur:
+        en_cours = {}
+        a_traiter = iter(a_convertir)
+        while True:
+            for source, destination in a_traiter:
+                en_cours[executeur.submit(transcoder_fichier, source, destination, version, options)] = source
+                if len(en_cours) >= 2 * jobs:
+                    break
+            if not en_cours:
+                break
+            termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+            for futur in termines:
+                source = en_cours.pop(futur)
+                try:
+                    taille_source, taille_sortie = futur.result()
+                except Exception as erreur:
+                    stats['erreurs'] += 1
+                    afficher(f'{source} >> error: {erreur!r}')
+                    continue
+                stats['images'] += 1
+                stats['octets_lus'] += taille_source
+                stats['octets_ecrits'] += taille_sortie
+    stats['duree'] = time.perf_counter() - debut
+    stats['mo_par_seconde'] = stats['octets_lus'] / 1e6 / stats['duree'] if stats['duree'] else 0.0
+    stats['images_par_seconde'] = stats['images'] / stats['duree'] if stats['duree'] else 0.0
+    return stats
+
+
+def parser_arguments(arguments=None):
+    parser = argparse.ArgumentParser(prog='python -m ulbmp', description='Outils pour le format ULBMP')
+    commandes = parser.add_subparsers(dest='commande', required=True)
+    transcodage = commandes.add_parser('transcode', help='convertit des fichiers ULBMP ou BMP dans une version ULBMP')
+    transcodage.add_argument('entrees', nargs='+', help='fichiers, motifs glob ou dossiers')
+    transcodage.add_argument('-o', '--output-dir', default='transcoded', help='dossier de sortie')
+    transcodage.add_argument('-v', '--version', type=int, choices=(1, 2, 3, 4, 5), required=True)
+    transcodage.add_argument('-d', '--depth', default=None, help="profondeur de la version 3 (1, 2, 4, 8, 24 ou auto)")
+    transcodage.add_argument('--rle', action='store_true', help='RLE pour la version 3')
+    transcodage.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='conversions simultanées')
+    transcodage.add_argument('--executor', choices=('thread', 'process'), default='thread')
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parser_arguments(arguments)
+    options = {}
+    if arguments.version == 3:
+        depth = arguments.depth or 'auto'
+        options = {'depth': depth if depth == 'auto' else int(depth), 'rle': arguments.rle}
+    fichiers = trouver_fichiers(arguments.entrees)
+    if not fichiers:
+        print('no input file found', file=sys.stderr)
+        return 1
+    stats = transcode(fichiers, arguments.output_dir, arguments.version, options, arguments.jobs, arguments.executor)
+    print(f"{stats['images']} images ({stats['erreurs']} errors) in {stats['duree']:.2f} s >> "
+          f"{stats['mo_par_seconde']:.2f} MB/s | {stats['images_par_seconde']:.2f} images/s | "
+          f"{stats['octets_lus']} bytes read, {stats['octets_ecrits']} bytes written")
+    return 1 if stats['erreurs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())